@@ -0,0 +1,103 @@
+import numpy as np
+
+STATE_FIELDS = ('mutation_rate', 'tournament_size', 'population_size', 'diversity', 'best_fitness', 'stalled',
+                'restarts')  # What a Checkpoint keeps of an AdaptiveControl
+
+
+class AdaptiveControl:
+    """GA parameters for one CubeSolver run that follow the population's diversity and progress.
+
+    observe() is called with every scored generation. A population that has collapsed onto a few sequences
+    gets more mutation and a gentler tournament, and diversify() mutates its repeated rows; a diverse one gets
+    the reverse. The population grows while the best fitness is stuck and shrinks back while it improves, and
+    after stall_generations without improvement restart() replaces part of the population with mutated
+    copies of the elites and new random sequences.
+    """
+
+    def __init__(self, solver):
+        self.solver = solver  # Supplies the starting parameters, the limits they scale from and the GA operators
+        self.mutation_rate = solver.mutation_rate
+        self.tournament_size = solver.tournament_size
+        self.population_size = solver.population_size
+        self.low_diversity = 0.5  # Share of distinct sequences below which mutation goes up and pressure down
+        self.high_diversity = 0.9  # Share of distinct sequences above which mutation goes down and pressure up
+        self.rate_step = 1.25  # Factor the mutation rate changes by per generation
+        self.population_step = 0.1  # Share of the population added or removed per generation
+        self.diversity = 1.0  # Share of distinct sequences in the last observed generation
+        self.best_fitness = None
+        self.stalled = 0  # Generations since the best fitness last improved
+        self.restarts = 0
+
+    def state(self):
+        """The evolving parameters and counters as a JSON-ready dict, for Checkpoint"""
+        return {name: getattr(self, name) for name in STATE_FIELDS}
+
+    def restore(self, state):
+        """Continue from a dict returned by state()"""
+        for name in STATE_FIELDS:
+            setattr(self, name, state[name])
+
+    def observe(self, codes, fitness_scores):
+        """Adjust the parameters after a scored generation; returns True when a partial restart is due"""
+        solver = self.solver
+        rows = np.ascontiguousarray(codes).view(np.dtype((np.void, codes.shape[1])))
+        self.diversity = len(np.unique(rows)) / len(codes)
+        best = float(np.max(fitness_scores))
+        if self.best_fitness is None or best > self.best_fitness:
+            self.best_fitness = best
+            self.stalled = 0
+        else:
+            self.stalled += 1
+
+        if self.diversity < self.low_diversity:
+            self.mutation_rate = min(self.mutation_rate * self.rate_step, 0.5)
+            self.tournament_size = max(self.tournament_size - 1, 2)
+        elif self.diversity > self.high_diversity:
+            self.mutation_rate = max(self.mutation_rate / self.rate_step, solver.mutation_rate / 2)
+            self.tournament_size = min(self.tournament_size + 1, 2 * solver.tournament_size)
+
+        if self.stalled == 0:
+            size = self.population_size * (1 - self.population_step)
+        elif self.stalled >= solver.stall_generations // 3:
+            size = self.population_size * (1 + self.population_step)
+        else:
+            size = self.population_size
+        self.population_size = int(np.clip(size, solver.population_size // 2, 2 * solver.population_size))
+
+        if self.stalled < solver.stall_generations:
+            return False
+        self.stalled = 0
+        self.mutation_rate = solver.mutation_rate
+        self.tournament_size = solver.tournament_size
+        return True
+
+    def diversify(self, codes, lengths, rng):
+        """While diversity is low, mutate every row that repeats an earlier one. Returns (codes, lengths)."""
+        if self.diversity >= self.low_diversity:
+            return codes, lengths
+        rows = np.ascontiguousarray(codes).view(np.dtype((np.void, codes.shape[1])))[:, 0]
+        repeats = np.ones(len(codes), dtype=bool)
+        repeats[np.unique(rows, return_index=True)[1]] = False
+        if repeats.any():
+            codes[repeats], lengths[repeats] = self.solver.mutate_population(codes[repeats], lengths[repeats], rng,
+                                                                            mutation_rate=1.0)
+        return codes, lengths
+
+    def restart(self, codes, lengths, rng):
+        """Replace restart_fraction of the rows after the elites: half with copies of the elites mutated
+        several times over, half with new random sequences. Returns (codes, lengths)."""
+        solver = self.solver
+        self.restarts += 1
+        elites = min(solver.elite_size, len(codes))
+        count = int((len(codes) - elites) * solver.restart_fraction)
+        if count <= 0 or elites == 0:
+            return codes, lengths
+        seeded = count // 2
+        picks = rng.integers(0, elites, seeded)
+        copies, copy_lengths = codes[picks].copy(), lengths[picks].copy()
+        for _ in range(3):
+            copies, copy_lengths = solver.mutate_population(copies, copy_lengths, rng, mutation_rate=1.0)
+        fresh, fresh_lengths = solver.create_population(count - seeded, rng)
+        codes = np.concatenate([codes[:len(codes) - count], copies, fresh])
+        lengths = np.concatenate([lengths[:len(lengths) - count], copy_lengths, fresh_lengths])
+        return codes, lengths
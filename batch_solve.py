@@ -0,0 +1,223 @@
+"""Solve a JSONL corpus of scrambles without a display.
+
+Each input line is a JSON object with an optional "id" and either "moves" (notation such as "F R' U2")
+or "state" (54 sticker colors, flat or as 6x3x3). One JSON result per input line is written as soon as
+it is ready, so the output is in completion order; "line" gives the input line number. With --batch-size
+the ga engine solves that many lines at a time together (CubeSolver.solve_many), which gets through a
+large corpus faster than solving its lines one by one.
+
+    python batch_solve.py scrambles.jsonl -o results.jsonl --engine ga --workers 8 --time-budget 5
+"""
+import argparse
+import contextlib
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+import numpy as np
+from cube import RubiksCube, check_state, format_moves, parse_moves
+
+ENGINES = ('ga', 'two-phase', 'bidirectional')
+
+# Per-process solver, created once by _init_worker
+_worker = {}
+
+
+def _init_worker(engine, options):
+    if engine == 'two-phase':
+        from two_phase import TwoPhaseSolver
+        solver = TwoPhaseSolver(options.get('table_dir'))
+        solver.load_tables()
+        if options.get('time_budget'):
+            solver.time_limit = options['time_budget']
+    elif engine == 'bidirectional':
+        from solver import BidirectionalSolver
+        solver = BidirectionalSolver()
+        if options.get('memory_limit'):
+            solver.memory_limit = int(options['memory_limit'] * 1024 ** 2)
+    else:
+        from solver import CubeSolver
+        solver = CubeSolver()
+        solver.adaptive = bool(options.get('adaptive'))
+        if options.get('pattern_db'):
+            from pattern_db import PatternDatabase
+            solver.pattern_database = PatternDatabase(options.get('table_dir')).load()
+    _worker.update(engine=engine, solver=solver, options=options)
+
+
+def prepare_tables(engine, options):
+    """Generate any missing pruning tables once, before worker processes start and would each build them"""
+    if engine == 'two-phase':
+        from two_phase import TwoPhaseSolver
+        TwoPhaseSolver(options.get('table_dir')).load_tables()
+    elif engine == 'ga' and options.get('pattern_db'):
+        from pattern_db import PatternDatabase
+        PatternDatabase(options.get('table_dir')).load()
+
+
+def _parse_cube(record):
+    # Build the scrambled cube described by one input record. Every malformed record raises ValueError.
+    if not isinstance(record, dict):
+        raise ValueError('record must be a JSON object')
+    cube = RubiksCube()
+    if 'moves' in record:
+        if not isinstance(record['moves'], str):
+            raise ValueError('"moves" must be a string such as "F R\' U2"')
+        cube.apply_moves(parse_moves(record['moves']))
+    elif 'state' in record:
+        check_state(record['state'])
+        cube.state = np.asarray(record['state'], dtype=np.int8).reshape(6, 3, 3)
+    else:
+        raise ValueError('record needs a "moves" or a "state" field')
+    return cube
+
+
+def solve_line(number, line):
+    """Solve one input line and return its result record"""
+    result = {'line': number}
+    start = time.perf_counter()
+    try:
+        record = json.loads(line)
+        if 'id' in record:
+            result['id'] = record['id']
+        cube = _parse_cube(record)
+        options = _worker['options']
+        if options.get('seed') is not None:
+            random.seed(options['seed'] + number)  # Same corpus and seed give the same results
+        with contextlib.redirect_stdout(None):  # Keep solver progress messages out of the JSONL stream
+            if _worker['engine'] == 'two-phase':
+                solution = _worker['solver'].solve(cube)
+                evaluations = None
+            elif _worker['engine'] == 'bidirectional':
+                outcome = _worker['solver'].search(cube)
+                solution, evaluations = outcome.solution, outcome.evaluations
+            else:
+                outcome = _worker['solver'].solve_anytime(cube, time_budget=options.get('time_budget'),
+                                                          max_evaluations=options.get('max_evaluations'))
+                solution, evaluations = outcome.solution, outcome.evaluations
+        cube.apply_moves(solution)
+        result.update(solved=cube.is_solved(), solution=format_moves(solution), length=len(solution),
+                      evaluations=evaluations)
+    except (ValueError, KeyError, TypeError) as error:
+        result['error'] = str(error)
+    result['time'] = time.perf_counter() - start
+    return result
+
+
+def solve_batch(numbered_lines):
+    """Solve a list of (number, line) pairs and return their result records in the same order.
+
+    The ga engine solves all valid cubes of the batch together with CubeSolver.solve_many, giving it the
+    per-scramble time and evaluation budgets of the whole batch; other engines, adaptive runs and single
+    lines go through solve_line one at a time. "time" is then the time until that cube was solved.
+    """
+    options = _worker['options']
+    if _worker['engine'] != 'ga' or options.get('adaptive') or len(numbered_lines) < 2:
+        return [solve_line(number, line) for number, line in numbered_lines]
+
+    start = time.perf_counter()
+    results, cubes, pending = [], [], []
+    for number, line in numbered_lines:
+        result = {'line': number}
+        try:
+            record = json.loads(line)
+            if 'id' in record:
+                result['id'] = record['id']
+            cubes.append(_parse_cube(record))
+            pending.append(result)
+        except (ValueError, KeyError, TypeError) as error:
+            result.update(error=str(error), time=time.perf_counter() - start)
+        results.append(result)
+    if not cubes:
+        return results
+
+    if options.get('seed') is not None:
+        random.seed(options['seed'] + numbered_lines[0][0])  # Same corpus, seed and batching give the same results
+    time_budget, max_evaluations = options.get('time_budget'), options.get('max_evaluations')
+    with contextlib.redirect_stdout(None):
+        outcomes = _worker['solver'].solve_many(
+            [cube.state for cube in cubes], time_budget=time_budget and time_budget * len(cubes),
+            max_evaluations=max_evaluations and max_evaluations * len(cubes))
+    for cube, outcome, result in zip(cubes, outcomes, pending):
+        cube.apply_moves(outcome.solution)
+        result.update(solved=cube.is_solved(), solution=format_moves(outcome.solution), length=len(outcome.solution),
+                      evaluations=outcome.evaluations, time=outcome.elapsed)
+    return results
+
+
+def run(lines, output, engine='ga', workers=1, batch_size=1, **options):
+    """Solve every line of an iterable and write one JSON result per line to output.
+
+    Lines go to solve_batch batch_size at a time. At most 2 * workers batches are in flight at once, so
+    memory stays flat however long the input is.
+    """
+    if workers <= 1:
+        _init_worker(engine, options)
+        for batch in _batches(lines, batch_size):
+            for result in solve_batch(batch):
+                _write(output, result)
+        return
+
+    prepare_tables(engine, options)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(engine, options)) as pool:
+        pending = set()
+        for batch in _batches(lines, batch_size):
+            if len(pending) >= 2 * workers:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    for result in future.result():
+                        _write(output, result)
+            pending.add(pool.submit(solve_batch, batch))
+        for future in wait(pending).done:
+            for result in future.result():
+                _write(output, result)
+
+
+def _batches(lines, batch_size):
+    # Lists of up to batch_size (line number, line) pairs, skipping blank lines
+    batch = []
+    for number, line in enumerate(lines, 1):
+        if line.strip():
+            batch.append((number, line))
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
+
+
+def _write(output, result):
+    output.write(json.dumps(result) + '\n')
+    output.flush()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Solve a JSONL file of scrambles without opening a window')
+    parser.add_argument('input', help="JSONL scrambles, or - for standard input")
+    parser.add_argument('-o', '--output', default='-', help='JSONL results file, or - for standard output')
+    parser.add_argument('--engine', choices=ENGINES, default='ga')
+    parser.add_argument('--workers', type=int, default=1, help='worker processes (0 for one per CPU)')
+    parser.add_argument('--batch-size', type=int, default=1, help='lines the ga engine solves together')
+    parser.add_argument('--time-budget', type=float, help='seconds per scramble for the ga and two-phase engines')
+    parser.add_argument('--max-evaluations', type=int, help='evaluations per scramble for the ga engine')
+    parser.add_argument('--seed', type=int, help='base random seed, offset by the line number')
+    parser.add_argument('--table-dir', help='pruning table directory for the two-phase engine and --pattern-db')
+    parser.add_argument('--memory-limit', type=float, help='megabytes of search state for the bidirectional engine')
+    parser.add_argument('--pattern-db', action='store_true', help='score the ga engine with pattern databases')
+    parser.add_argument('--adaptive', action='store_true', help='let the ga engine adapt its parameters during each run')
+    args = parser.parse_args(argv)
+
+    workers = args.workers or os.cpu_count() or 1
+    with contextlib.ExitStack() as stack:
+        lines = sys.stdin if args.input == '-' else stack.enter_context(open(args.input))
+        output = sys.stdout if args.output == '-' else stack.enter_context(open(args.output, 'w'))
+        run(lines, output, engine=args.engine, workers=workers, batch_size=max(args.batch_size, 1),
+            time_budget=args.time_budget, max_evaluations=args.max_evaluations, seed=args.seed,
+            table_dir=args.table_dir, memory_limit=args.memory_limit, pattern_db=args.pattern_db,
+            adaptive=args.adaptive)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,206 @@
+"""Reproducible benchmarks for the move engine, the fitness kernel and CubeSolver.
+
+    python bench.py run -o base.json                       # default suite
+    python bench.py run -o new.json --param population_size=500
+    python bench.py run -o pdb.json --pattern-db            # pattern-database fitness
+    python bench.py compare base.json new.json --threshold 0.1
+
+Scramble sets are seeded, so two runs see exactly the same cubes. compare exits with status 1 when a
+metric got worse by more than the threshold.
+"""
+import argparse
+import contextlib
+import json
+import platform
+import random
+import sys
+import time
+import numpy as np
+from cube import MOVES, SOLVED_STICKERS, RubiksCube, apply_move_codes, encode_population
+from pattern_db import PatternDatabase
+from solver import CubeSolver
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+# Metric name suffix -> whether larger values are better
+HIGHER_IS_BETTER = {'per_second': True, 'success_rate': True, 'seconds': False, 'mb': False}
+
+
+def scramble_set(depth, count, seed):
+    """count cubes scrambled with `depth` random moves each, the same for the same seed"""
+    rng = random.Random(f'{seed}-{depth}')
+    cubes = []
+    for _ in range(count):
+        cube = RubiksCube()
+        cube.scramble(depth, rng)
+        cubes.append(cube)
+    return cubes
+
+
+def bench_moves(seconds, seed):
+    """Quarter turns per second through RubiksCube.make_move, one cube at a time"""
+    rng = random.Random(seed)
+    moves = [rng.choice(MOVES) for _ in range(10000)]
+    cube = RubiksCube()
+    count = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        for move in moves:
+            cube.make_move(move)
+        count += len(moves)
+    return count / (time.perf_counter() - start)
+
+
+def bench_fitness(solver, seconds, seed):
+    """Individuals replayed and scored per second by CubeSolver.evaluate_population"""
+    initial_state = scramble_set(20, 1, seed)[0].get_state()
+    population, _ = solver.create_population(solver.population_size, np.random.default_rng(seed))
+    count = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        solver.evaluate_population(initial_state, population)
+        count += len(population)
+    return count / (time.perf_counter() - start)
+
+
+def bench_batch_moves(seconds, seed, rows=1000, width=50):
+    """Quarter turns per second through the batched apply_move_codes kernel"""
+    rng = random.Random(seed)
+    codes = encode_population([[rng.choice(MOVES) for _ in range(width)] for _ in range(rows)])
+    states = np.tile(SOLVED_STICKERS, (rows, 1))
+    count = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        apply_move_codes(states, codes)
+        count += codes.size
+    return count / (time.perf_counter() - start)
+
+
+def bench_solves(solver, depths, count, seed, time_budget):
+    """Success rate, time-to-solution percentiles and evaluation rate of solve_anytime per scramble depth"""
+    results = {}
+    for depth in depths:
+        times, solved, evaluations, elapsed = [], 0, 0, 0.0
+        for index, cube in enumerate(scramble_set(depth, count, seed)):
+            random.seed(f'{seed}-{depth}-{index}')
+            with contextlib.redirect_stdout(None):
+                outcome = solver.solve_anytime(cube, time_budget=time_budget)
+            check = RubiksCube()
+            check.state = cube.get_state()
+            check.apply_moves(outcome.solution)
+            if check.is_solved():
+                solved += 1
+                times.append(outcome.elapsed)
+            evaluations += outcome.evaluations
+            elapsed += outcome.elapsed
+        results[f'depth_{depth}'] = {
+            'success_rate': solved / count,
+            'solve_p50_seconds': _percentile(times, 50),
+            'solve_p90_seconds': _percentile(times, 90),
+            'solve_p99_seconds': _percentile(times, 99),
+            'evaluations_per_second': evaluations / elapsed if elapsed else 0.0,
+        }
+    return results
+
+
+def _percentile(values, q):
+    return float(np.percentile(values, q)) if values else None
+
+
+def _peak_memory_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 ** 2 if sys.platform == 'darwin' else peak / 1024  # Bytes on macOS, KiB elsewhere
+
+
+def run(depths=(3, 5, 8), count=10, seed=0, seconds=1.0, time_budget=10.0, params=None, pattern_db=False):
+    """Run the whole suite and return its results as a JSON-ready dict"""
+    solver = CubeSolver()
+    for name, value in (params or {}).items():
+        setattr(solver, name, value)
+    if pattern_db:
+        solver.pattern_database = PatternDatabase().load()
+    metrics = {
+        'make_move_per_second': bench_moves(seconds, seed),
+        'batch_moves_per_second': bench_batch_moves(seconds, seed),
+        'fitness_evaluations_per_second': bench_fitness(solver, seconds, seed),
+    }
+    for group, values in bench_solves(solver, depths, count, seed, time_budget).items():
+        for name, value in values.items():
+            metrics[f'{group}_{name}'] = value
+    metrics['peak_memory_mb'] = _peak_memory_mb()
+    return {
+        'config': {'depths': list(depths), 'count': count, 'seed': seed, 'seconds': seconds,
+                   'time_budget': time_budget, 'params': params or {}, 'pattern_db': pattern_db},
+        'environment': {'python': platform.python_version(), 'numpy': np.__version__,
+                        'machine': platform.machine(), 'processor': platform.processor()},
+        'metrics': metrics,
+    }
+
+
+def compare(base, new, threshold=0.1):
+    """Return (name, base value, new value, relative change, regressed) for every metric both runs have"""
+    rows = []
+    for name, old in base['metrics'].items():
+        value = new['metrics'].get(name)
+        if old is None or value is None:
+            continue
+        higher_is_better = next((better for suffix, better in HIGHER_IS_BETTER.items() if name.endswith(suffix)), True)
+        change = (value - old) / abs(old) if old else 0.0
+        worse = -change if higher_is_better else change
+        rows.append((name, old, value, change, worse > threshold))
+    return rows
+
+
+def _parse_param(text):
+    name, _, value = text.partition('=')
+    return name, json.loads(value)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the cube move engine and CubeSolver')
+    commands = parser.add_subparsers(dest='command', required=True)
+    run_parser = commands.add_parser('run', help='run the suite and write JSON results')
+    run_parser.add_argument('-o', '--output', help='results file (default: standard output)')
+    run_parser.add_argument('--depths', type=int, nargs='+', default=[3, 5, 8], help='scramble depths to solve')
+    run_parser.add_argument('--count', type=int, default=10, help='scrambles per depth')
+    run_parser.add_argument('--seed', type=int, default=0)
+    run_parser.add_argument('--seconds', type=float, default=1.0, help='duration of each throughput benchmark')
+    run_parser.add_argument('--time-budget', type=float, default=10.0, help='seconds allowed per solve')
+    run_parser.add_argument('--param', type=_parse_param, action='append', default=[],
+                            help='CubeSolver attribute override, e.g. population_size=500')
+    run_parser.add_argument('--pattern-db', action='store_true', help='score fitness with pattern databases')
+    compare_parser = commands.add_parser('compare', help='flag regressions between two result files')
+    compare_parser.add_argument('base')
+    compare_parser.add_argument('new')
+    compare_parser.add_argument('--threshold', type=float, default=0.1, help='relative change counted as a regression')
+    args = parser.parse_args(argv)
+
+    if args.command == 'run':
+        results = run(args.depths, args.count, args.seed, args.seconds, args.time_budget, dict(args.param),
+                      args.pattern_db)
+        text = json.dumps(results, indent=2)
+        if args.output:
+            with open(args.output, 'w') as handle:
+                handle.write(text + '\n')
+        else:
+            print(text)
+        return 0
+
+    with open(args.base) as handle:
+        base = json.load(handle)
+    with open(args.new) as handle:
+        new = json.load(handle)
+    regressions = 0
+    for name, old, value, change, regressed in compare(base, new, args.threshold):
+        regressions += regressed
+        print(f"{'REGRESSION' if regressed else 'ok':<10} {name:<40} {old:>14.4g} -> {value:<14.4g} {change:+.1%}")
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,51 @@
+import json
+import numpy as np
+from storage import atomic_write
+
+CHECKPOINT_VERSION = 1
+
+
+class Checkpoint:
+    """Snapshot of a CubeSolver run taken after a generation was scored and before the next one is bred.
+
+    Resuming from it with the same cube continues exactly as the original run would have, adaptive runs
+    included. A different cube can still start from its population, which is often a good seed for a nearby
+    scramble.
+    """
+
+    def __init__(self, initial_state, generation, codes, fitness, rng_state, best, best_fitness, evaluations,
+                 adaptive_state=None):
+        self.initial_state = np.asarray(initial_state, dtype=np.int8).reshape(54)  # Scramble the run is solving
+        self.generation = generation  # Index of the generation that codes and fitness belong to
+        self.codes = codes  # Population as a padded (N, max_sequence_length) int8 move-code matrix
+        self.fitness = fitness  # Fitness of every row of codes
+        self.rng_state = rng_state  # numpy bit generator state, as returned by Generator.bit_generator.state
+        self.best = best  # Move codes of the fittest sequence seen
+        self.best_fitness = best_fitness
+        self.evaluations = evaluations  # Individuals scored up to and including this generation
+        self.adaptive_state = adaptive_state  # AdaptiveControl.state() of an adaptive run, else None
+
+    def matches(self, state):
+        """True when the checkpoint was taken while solving this cube state"""
+        return np.array_equal(self.initial_state, np.asarray(state).reshape(54))
+
+    def save(self, path):
+        """Write the checkpoint as an uncompressed .npz file, replacing any previous one atomically"""
+        with atomic_write(path) as handle:
+            np.savez(handle, version=CHECKPOINT_VERSION, initial_state=self.initial_state,
+                     generation=self.generation, codes=self.codes, fitness=self.fitness,
+                     rng_state=np.frombuffer(json.dumps(self.rng_state).encode(), dtype=np.uint8),
+                     best=np.asarray(self.best, dtype=np.int8), best_fitness=self.best_fitness,
+                     evaluations=self.evaluations,
+                     adaptive_state=np.frombuffer(json.dumps(self.adaptive_state).encode(), dtype=np.uint8))
+
+    @classmethod
+    def load(cls, path):
+        """Read a checkpoint written by save()"""
+        with np.load(path) as data:
+            if int(data['version']) != CHECKPOINT_VERSION:
+                raise ValueError(f'{path} is checkpoint version {int(data["version"])}, expected {CHECKPOINT_VERSION}')
+            adaptive_state = json.loads(data['adaptive_state'].tobytes()) if 'adaptive_state' in data else None
+            return cls(data['initial_state'], int(data['generation']), data['codes'], data['fitness'],
+                       json.loads(data['rng_state'].tobytes()), data['best'], float(data['best_fitness']),
+                       int(data['evaluations']), adaptive_state)
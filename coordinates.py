@@ -0,0 +1,134 @@
+from math import comb, factorial
+import numpy as np
+
+# Sticker slots grouped by the orbits the moves keep them in (centers never move)
+CORNER_SLOTS = np.array([i for i in range(54) if i % 9 in (0, 2, 6, 8)], dtype=np.intp)
+EDGE_SLOTS = np.array([i for i in range(54) if i % 9 in (1, 3, 5, 7)], dtype=np.intp)
+CENTER_SLOTS = np.arange(4, 54, 9, dtype=np.intp)
+POPCOUNTS = np.array([bin(value).count('1') for value in range(256)], dtype=np.intp)  # True bits of each byte value
+UNREACHED = 255  # bfs_distances entry of a coordinate never reached
+
+_subset_rank_cache = {}  # Row length -> rank_subset byte tables
+
+
+def multiset_size(counts):
+    # Number of distinct arrangements of a multiset with the given class counts
+    size = factorial(sum(counts))
+    for count in counts:
+        size //= factorial(count)
+    return size
+
+
+def rank_multiset(labels, counts):
+    # Lexicographic rank of each row of labels (N, n), a permutation of the multiset given by counts
+    labels = np.asarray(labels)
+    rows = len(labels)
+    remaining = np.tile(np.asarray(counts, dtype=np.int64), (rows, 1))
+    total = np.full(rows, multiset_size(counts), dtype=np.int64)  # Arrangements of what is left
+    rank = np.zeros(rows, dtype=np.int64)
+    row_index = np.arange(rows)
+    for position in range(labels.shape[1]):
+        left = labels.shape[1] - position
+        label = labels[:, position]
+        for smaller in range(len(counts)):
+            below = label > smaller
+            rank += np.where(below, total * remaining[:, smaller] // left, 0)
+        total = total * remaining[row_index, label] // left
+        remaining[row_index, label] -= 1
+    return rank
+
+
+def unrank_multiset(ranks, counts):
+    # Inverse of rank_multiset: (N,) ranks -> (N, n) labels
+    ranks = np.array(ranks, dtype=np.int64)
+    rows = len(ranks)
+    length = sum(counts)
+    remaining = np.tile(np.asarray(counts, dtype=np.int64), (rows, 1))
+    total = np.full(rows, multiset_size(counts), dtype=np.int64)
+    labels = np.empty((rows, length), dtype=np.int8)
+    row_index = np.arange(rows)
+    for position in range(length):
+        left = length - position
+        chosen = np.zeros(rows, dtype=np.int64)
+        settled = np.zeros(rows, dtype=bool)
+        for label in range(len(counts)):
+            block = total * remaining[:, label] // left  # Arrangements starting with this label
+            take = ~settled & (ranks < block)
+            chosen[take] = label
+            settled |= take
+            ranks = np.where(settled, ranks, ranks - block)
+        labels[:, position] = chosen
+        total = total * remaining[row_index, chosen] // left
+        remaining[row_index, chosen] -= 1
+    return labels
+
+
+def slot_permutation(permutation, slots):
+    # Restrict a 54-entry sticker permutation to an orbit of slots, as indices into that slot list
+    position = {slot: i for i, slot in enumerate(np.asarray(slots).tolist())}
+    return np.array([position[source] for source in np.asarray(permutation)[slots].tolist()], dtype=np.intp)
+
+
+def build_move_table(permutations, slots, counts):
+    # Move table (len(permutations), size) for the coordinate ranking the class labels on `slots`.
+    # Rows of the result map a coordinate before the move to the coordinate after it.
+    size = multiset_size(counts)
+    labels = unrank_multiset(np.arange(size), counts)
+    table = np.empty((len(permutations), size), dtype=np.int32)
+    for index, permutation in enumerate(permutations):
+        table[index] = rank_multiset(labels[:, slot_permutation(permutation, slots)], counts)
+    return table
+
+
+def bfs_distances(neighbour, turns, goal, size):
+    # Breadth-first distance of every coordinate below size from the goal coordinates, where
+    # neighbour(coords, turn) maps an array of coordinates through one turn; UNREACHED where never reached
+    distance = np.full(size, UNREACHED, dtype=np.uint8)
+    distance[goal] = 0
+    frontier = np.asarray(goal)
+    depth = 0
+    while frontier.size:
+        depth += 1
+        found = []
+        for turn in turns:
+            reached = neighbour(frontier, turn)
+            reached = reached[distance[reached] == UNREACHED]
+            distance[reached] = depth
+            found.append(reached)
+        frontier = np.unique(np.concatenate(found))
+    return distance
+
+
+def rank_subset(mask):
+    # rank_multiset for two labels: the rank of each boolean row (N, n) among the rows with as many True
+    # entries, in the order rank_multiset(mask, (n - k, k)) gives them. Rows are read a byte at a time through
+    # tables of what each byte adds given the True entries after it.
+    mask = np.asarray(mask, dtype=bool)
+    tables = _subset_rank_tables(mask.shape[1])
+    chunks = np.packbits(mask, axis=1, bitorder='little')  # Bit j of byte b is position 8 * b + j
+    rank = np.zeros(len(mask), dtype=np.int64)
+    ones_after = np.zeros(len(mask), dtype=np.intp)
+    for chunk in range(chunks.shape[1] - 1, -1, -1):
+        value = chunks[:, chunk]
+        rank += tables[chunk, value, ones_after]
+        ones_after += POPCOUNTS[value]
+    return rank
+
+
+def _subset_rank_tables(length):
+    # tables[b, value, after]: rank added by byte b holding value when `after` True entries follow it, summing
+    # C(positions after p, True entries from p on) over its True positions p as rank_multiset does
+    if length not in _subset_rank_cache:
+        chunks = (length + 7) // 8
+        tables = np.zeros((chunks, 256, length + 1), dtype=np.int64)
+        for chunk in range(chunks):
+            for value in range(256):
+                for after in range(length + 1):
+                    ones = after
+                    for bit in range(7, -1, -1):
+                        position = 8 * chunk + bit
+                        if value >> bit & 1 and position < length:
+                            ones += 1
+                            tables[chunk, value, after] += comb(length - 1 - position, ones)
+        _subset_rank_cache[length] = tables
+    return _subset_rank_cache[length]
@@ -1,16 +1,47 @@
 import random
 import numpy as np
+from coordinates import CENTER_SLOTS, CORNER_SLOTS, EDGE_SLOTS
+
+# Every quarter turn as a (face, direction) pair, in the same order as CubeSolver.moves
+MOVES = [(f, d) for f in range(6) for d in [-1, 1]]
+MOVE_INDEX = {move: index for index, move in enumerate(MOVES)}  # (face, direction) -> row in MOVE_PERMUTATIONS
+SOLVED_STICKERS = np.repeat(np.arange(6, dtype=np.int8), 9)  # Flat sticker layout of a solved cube
+FACE_LETTERS = 'FBRLUD'  # Front, Back, Right, Left, Top (Up), Bottom (Down) in face index order
+OPPOSITE_FACE = [1, 0, 3, 2, 5, 4]  # Face across the cube from each face
+SCRAMBLE_CHUNK = 1 << 16  # Scrambles generated together by scramble_states; bounds its temporary memory
+GROUPED_GATHER_ROWS = 256  # From this many rows apply_move_codes gathers per move rather than per row
+
 
 class RubiksCube:
     def __init__(self):
         # Initialize the cube with each face having a unique color
         # Colors: 0=white, 1=yellow, 2=red, 3=orange, 4=blue, 5=green
-        self.state = np.zeros((6, 3, 3), dtype=int)
-        for i in range(6):
-            self.state[i] = np.full((3, 3), i)  # Set each face to its corresponding color index
+        # The 54 stickers live in one flat array; face f occupies entries 9*f .. 9*f+8 in row-major order
+        self._stickers = SOLVED_STICKERS.copy()
+
+    @property
+    def state(self):
+        # (6, 3, 3) view of the flat sticker array, so writes through it update the cube in place
+        return self._stickers.reshape(6, 3, 3)
+
+    @state.setter
+    def state(self, value):
+        self._stickers[:] = np.asarray(value).reshape(54)
 
     def make_move(self, move):
-        # Perform a move on the Rubik's Cube
+        # Perform a move on the Rubik's Cube as a single gather through its precomputed permutation
+        self._stickers[:] = self._stickers[MOVE_PERMUTATIONS[MOVE_INDEX[move]]]
+
+    def apply_moves(self, moves):
+        # Apply a whole move sequence at once through its composed permutation
+        self._stickers[:] = self._stickers[compose_moves(moves)]
+
+    def apply_permutation(self, permutation):
+        # Apply a precomputed 54-entry permutation (e.g. one returned by compose_moves)
+        self._stickers[:] = self._stickers[permutation]
+
+    def _slice_move(self, move):
+        # Reference slice-based implementation of a move; the permutation tables are derived from it
         face, direction = move
         # Rotate the selected face
         self.state[face] = np.rot90(self.state[face], -direction)  # Rotate face 90 degrees, direction controls clockwise/counter-clockwise
@@ -119,16 +150,246 @@ class RubiksCube:
             self.state[1][2] = self.state[2][2]  # Move the right column of the red face to the yellow face
             self.state[2][2] = temp  # Move the saved bottom right corner of the white face to the red face
     
-    def scramble(self):
-        # Scramble the cube by performing a series of random moves
-        moves = [(f, d) for f in range(6) for d in [-1, 1]]  # List of possible moves (face, direction)
-        for _ in range(20):  # Perform 20 random moves
-            self.make_move(random.choice(moves))  # Apply a random move
+    def scramble(self, length=20, rng=None):
+        # Scramble the cube by performing a series of random moves; pass a random.Random for a seeded scramble
+        rng = rng or random
+        moves = [rng.choice(MOVES) for _ in range(length)]  # Perform `length` random moves
+        self.apply_moves(moves)
+        return moves
 
     def is_solved(self):
         # Check if the cube is solved by verifying that each face has only one color
-        return all(np.all(self.state[i] == i) for i in range(6))
+        return bool(np.array_equal(self._stickers, SOLVED_STICKERS))
 
     def get_state(self):
         # Return a copy of the current state of the cube
         return self.state.copy()
+
+
+def compose_moves(moves):
+    # Collapse a move sequence into one permutation: applying A then B gathers through A[B]
+    permutation = IDENTITY_PERMUTATION
+    for move in moves:
+        permutation = permutation[MOVE_PERMUTATIONS[MOVE_INDEX[move]]]
+    return permutation
+
+
+def parse_moves(text):
+    # Parse notation such as "F R' U2" into (face, direction) moves: ' is counter-clockwise, 2 a half turn
+    moves = []
+    for token in text.split():
+        face = FACE_LETTERS.find(token[0])
+        if face < 0 or token[1:] not in ('', "'", '2'):
+            raise ValueError(f'invalid move {token!r}')
+        if token[1:] == "'":
+            moves.append((face, -1))
+        else:
+            moves.extend([(face, 1)] * (2 if token[1:] == '2' else 1))
+    return moves
+
+
+def format_moves(moves):
+    # Write (face, direction) moves in the notation read by parse_moves; two clockwise turns in a row become X2
+    tokens = []
+    for face, direction in moves:
+        if direction > 0 and tokens and tokens[-1] == FACE_LETTERS[face]:
+            tokens[-1] += '2'
+        else:
+            tokens.append(FACE_LETTERS[face] + ("'" if direction < 0 else ''))
+    return ' '.join(tokens)
+
+
+def simplify_moves(moves):
+    # Rewrite a move sequence in canonical form with the same effect. Opposite faces commute (and no other
+    # pair does), so each run of moves on one axis collapses to a net turn per face, listed Front/Right/Top
+    # before Back/Left/Bottom: nothing for a full turn, (f, 1) or (f, -1) for a quarter turn and (f, 1), (f, 1)
+    # for a half turn. Runs that cancel out entirely let their neighbours merge.
+    blocks = []  # [axis, {face: net quarter turns modulo 4}]
+    for face, direction in moves:
+        if blocks and blocks[-1][0] == face // 2:
+            turns = blocks[-1][1]
+            turns[face] = (turns.get(face, 0) + direction) % 4
+            if not any(turns.values()):
+                blocks.pop()
+        else:
+            blocks.append([face // 2, {face: direction % 4}])
+    simplified = []
+    for _, turns in blocks:
+        for face in sorted(turns):
+            simplified.extend((face, direction) for direction in FACE_TURN_DIRECTIONS[turns[face]])
+    return simplified
+
+
+def canonical_next(states, codes):
+    # Advance canonical-generator states (see CANONICAL_SUCCESSORS) by one move code each; NO_MOVE keeps the state
+    return CANONICAL_TRANSITIONS[states, codes]
+
+
+def canonical_states(codes):
+    # Canonical-generator state after every prefix of every row of a move-code matrix: column k follows k moves
+    states = np.empty((len(codes), codes.shape[1] + 1), dtype=np.int8)
+    states[:, 0] = CANONICAL_START
+    for column in range(codes.shape[1]):
+        states[:, column + 1] = canonical_next(states[:, column], codes[:, column])
+    return states
+
+
+def random_canonical_codes(count, width, rng):
+    # (count, width) int8 move codes, each row a uniformly drawn canonical sequence: every column is picked
+    # among the moves the canonical rules allow after the previous ones, so no move undoes, triples or
+    # reorders its neighbours
+    allowed = CANONICAL_SUCCESSORS[:, :len(MOVES)]
+    choices = np.argsort(~allowed, axis=1, kind='stable')  # Row per generator state: its allowed codes first
+    counts = allowed.sum(axis=1)
+    codes = np.empty((count, width), dtype=np.int8)
+    states = np.full(count, CANONICAL_START)
+    for column in range(width):
+        codes[:, column] = choices[states, rng.integers(0, counts[states])]
+        states = canonical_next(states, codes[:, column])
+    return codes
+
+
+def scramble_states(count, depth=20, seed=None):
+    # (count, 54) int8 sticker states, each `depth` non-redundant quarter turns (see random_canonical_codes) from
+    # solved. The same seed gives the same states; generation runs SCRAMBLE_CHUNK rows at a time.
+    rng = np.random.default_rng(seed)
+    states = np.empty((count, 54), dtype=np.int8)
+    for start in range(0, count, SCRAMBLE_CHUNK):
+        rows = min(SCRAMBLE_CHUNK, count - start)
+        solved = np.broadcast_to(SOLVED_STICKERS, (rows, 54))
+        states[start:start + rows] = apply_move_codes(solved, random_canonical_codes(rows, depth, rng))
+    return states
+
+
+def validate_states(states):
+    # Boolean mask of the rows of an (N, 54) sticker array (or of N 6x3x3 cubes) that are reachable cube states.
+    # Centers never move and no move takes a sticker between the corner and edge orbits, so a reachable state
+    # has centers 0..5 in face order and each color on exactly 4 corner and 4 edge stickers. The moves generate
+    # every even permutation of each orbit, and swapping two same-colored stickers fixes any parity, so those
+    # counts are also sufficient: this sticker model has no pieces whose orientation or parity could be wrong.
+    stickers = np.asarray(states).reshape(-1, 54)
+    rows = len(stickers)
+    usable = (stickers >= 0) & (stickers < 6)
+    if np.issubdtype(stickers.dtype, np.floating):
+        usable &= stickers == np.floor(stickers)  # Fractional colors (and NaN) make a row invalid
+    valid = usable.all(axis=1)
+    stickers = np.where(usable, stickers, 0).astype(np.intp)  # Unusable entries only need to be safe to count
+    valid &= (stickers[:, CENTER_SLOTS] == np.arange(6)).all(axis=1)
+    offsets = 6 * np.arange(rows)[:, None]
+    for slots in (CORNER_SLOTS, EDGE_SLOTS):
+        colors = stickers[:, slots] + offsets  # Row-local color bins
+        valid &= (np.bincount(colors.ravel(), minlength=6 * rows).reshape(rows, 6) == 4).all(axis=1)
+    return valid
+
+
+def check_state(state):
+    # Raise ValueError unless state holds the 54 sticker colors (flat or 6x3x3) of a reachable cube state.
+    # Checked on the raw values, so callers can cast to int8 afterwards without truncating or wrapping anything.
+    stickers = np.asarray(state)
+    if stickers.size != 54 or stickers.dtype.kind not in 'iuf' or not validate_states(stickers)[0]:
+        raise ValueError('state is not reachable: it must hold 54 sticker colors 0..5, with centers 0..5 in face '
+                         'order and each color on exactly 4 corner and 4 edge stickers')
+
+
+def _build_canonical_successors():
+    # allowed[state, code]: may move `code` follow the generator state in a canonical sequence. State 2 * c + r
+    # means the last move was code c, the second of a half turn when r is 1; CANONICAL_START precedes any move.
+    allowed = np.ones((2 * len(MOVES) + 1, len(MOVES) + 1), dtype=bool)
+    for last, (face, direction) in enumerate(MOVES):
+        for repeated in (0, 1):
+            for code, (next_face, next_direction) in enumerate(MOVES):
+                if next_face == face:  # A clockwise quarter turn may be doubled into a half turn, nothing more
+                    allowed[2 * last + repeated, code] = not repeated and direction == next_direction == 1
+                elif next_face // 2 == face // 2:  # Opposite faces commute: keep them in face order
+                    allowed[2 * last + repeated, code] = next_face > face
+    allowed.setflags(write=False)
+    return allowed
+
+
+def _build_canonical_transitions():
+    # (25, 13) int8 table of the generator state after each move code: 2*c + r as described above, where r says
+    # the move repeats the previous one; NO_MOVE keeps the state
+    states = np.arange(2 * len(MOVES) + 1)[:, None]
+    codes = np.arange(len(MOVES) + 1)[None, :]
+    repeated = (states != 2 * len(MOVES)) & (states // 2 == codes)
+    transitions = np.where(codes == len(MOVES), states, 2 * codes + repeated).astype(np.int8)
+    transitions.setflags(write=False)
+    return transitions
+
+
+def _build_move_permutations():
+    # Run each reference slice move on a cube whose stickers are labelled 0..53;
+    # the resulting layout is the gather index of that move
+    permutations = np.empty((len(MOVES), 54), dtype=np.intp)
+    for index, move in enumerate(MOVES):
+        cube = RubiksCube()
+        cube.state = np.arange(54).reshape(6, 3, 3)
+        cube._slice_move(move)
+        permutations[index] = cube._stickers
+    permutations.setflags(write=False)
+    return permutations
+
+
+def encode_moves(moves):
+    # Encode a list of (face, direction) moves as an int8 array of move indices
+    return np.fromiter((MOVE_INDEX[move] for move in moves), dtype=np.int8, count=len(moves))
+
+
+def decode_moves(codes):
+    # Decode move indices back into a list of (face, direction) tuples, ignoring NO_MOVE padding
+    return [MOVES[code] for code in np.asarray(codes).tolist() if code != NO_MOVE]
+
+
+def encode_population(sequences):
+    # Pack move sequences into one (len(sequences), longest) int8 matrix padded with NO_MOVE
+    width = max((len(sequence) for sequence in sequences), default=0)
+    codes = np.full((len(sequences), width), NO_MOVE, dtype=np.int8)
+    for row, sequence in enumerate(sequences):
+        codes[row, :len(sequence)] = [MOVE_INDEX[move] for move in sequence]
+    return codes
+
+
+def apply_move_codes(states, codes):
+    # Apply column k of codes to every row of states (N, 54) in one gather per column. Large batches instead
+    # sort each column's rows by move and gather each group through its move's single permutation, which
+    # avoids building an (N, 54) index array per column.
+    if len(states) < GROUPED_GATHER_ROWS:
+        for column in codes.T:
+            states = np.take_along_axis(states, PADDED_MOVE_PERMUTATIONS[column], axis=1)
+        return states
+    states = np.array(states, order='C')  # A copy the groups can be written into
+    for column in codes.T:
+        moving = np.flatnonzero(column != NO_MOVE)
+        if len(moving) < GROUPED_GATHER_ROWS:  # Mostly padding: gather just the rows that move
+            states[moving] = np.take_along_axis(states[moving], MOVE_PERMUTATIONS[column[moving]], axis=1)
+            continue
+        order = np.argsort(column, kind='stable')
+        bounds = np.searchsorted(column[order], np.arange(len(MOVES) + 1))
+        for code in range(len(MOVES)):  # NO_MOVE rows sort last and stay as they are
+            rows = order[bounds[code]:bounds[code + 1]]
+            if len(rows):
+                states[rows] = states[rows][:, MOVE_PERMUTATIONS[code]]
+    return states
+
+
+IDENTITY_PERMUTATION = np.arange(54, dtype=np.intp)
+IDENTITY_PERMUTATION.setflags(write=False)
+MOVE_PERMUTATIONS = _build_move_permutations()  # (12, 54): new_stickers = stickers[MOVE_PERMUTATIONS[i]]
+NO_MOVE = len(MOVES)  # Padding code for sequences shorter than the width of a batch
+PADDED_MOVE_PERMUTATIONS = np.vstack([MOVE_PERMUTATIONS, IDENTITY_PERMUTATION])  # Row NO_MOVE leaves a state unchanged
+PADDED_MOVE_PERMUTATIONS.setflags(write=False)
+CANONICAL_START = 2 * len(MOVES)  # Canonical-generator state before the first move
+CANONICAL_SUCCESSORS = _build_canonical_successors()  # (25, 13) bool, column NO_MOVE always allowed
+CANONICAL_TRANSITIONS = _build_canonical_transitions()  # (25, 13) int8, read by canonical_next
+FACE_TURN_DIRECTIONS = [[], [1], [1, 1], [-1]]  # Quarter turns spelling a net turn of 0-3 clockwise quarter turns
+# The 20 sticker slots each move changes and the slots their new stickers come from, so a move can be applied
+# (and scored) by touching only those: stickers[MOVED_STICKERS[i]] = stickers[MOVE_SOURCES[i]]
+MOVED_STICKERS = np.array([np.flatnonzero(permutation != IDENTITY_PERMUTATION) for permutation in MOVE_PERMUTATIONS])
+MOVE_SOURCES = np.take_along_axis(MOVE_PERMUTATIONS, MOVED_STICKERS, axis=1)
+# Row NO_MOVE copies 20 slots onto themselves
+PADDED_MOVED_STICKERS = np.vstack([MOVED_STICKERS, MOVED_STICKERS[:1]])
+PADDED_MOVE_SOURCES = np.vstack([MOVE_SOURCES, MOVED_STICKERS[:1]])
+MOVED_STICKERS.setflags(write=False)
+MOVE_SOURCES.setflags(write=False)
+PADDED_MOVED_STICKERS.setflags(write=False)
+PADDED_MOVE_SOURCES.setflags(write=False)
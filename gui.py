@@ -54,10 +54,28 @@ class CubeGUI:
 
         self.label_color = (0, 0, 0)  # Label color
         self.font = pygame.font.Font(None, 28)  # Font for labels
+        self.background_color = (255, 255, 255)  # White background
+        self.cube_start_x = 300  # Move cube display to the right
+
+        # Screen rectangle of every face
+        for face in range(6):
+            x_offset = self.layouts[face][0] * (self.cell_size * 3 + self.margin)
+            y_offset = self.layouts[face][1] * (self.cell_size * 3 + self.margin)
+            self.face_positions[face]['rect'] = pygame.Rect(self.cube_start_x + x_offset, self.center_y + y_offset,
+                                                            self.cell_size * 3, self.cell_size * 3)
 
         # Info box at the top left corner for instructions or information
         self.info_font = pygame.font.Font(None, 24)
         self.info_box = pygame.Rect(10, 10, 300, 100)
+        self.info_text = ["Press ENTER to solve"]
+
+        # Status line above the cube, e.g. solver progress, set through set_status()
+        self.status_font = pygame.font.Font(None, 36)
+        self.status_pos = (300, 50)
+        self.status = None
+        self.status_surface = None
+        self.status_rect = None  # Screen area covered by the status text currently drawn
+        self.status_changed = False
 
         # Button configuration for rotating the cube faces
         self.button_font = pygame.font.Font(None, 24)
@@ -104,78 +122,126 @@ class CubeGUI:
             'hover': False  # Hover state
         }
 
-    def draw(self):
-        # Clear screen first
-        self.screen.fill((255, 255, 255))  # White background
-
-        # Draw reset button and handle hover effect
-        mouse_pos = pygame.mouse.get_pos()
-        self.reset_button['hover'] = self.reset_button['rect'].collidepoint(mouse_pos)
-        button_color = self.reset_button['hover_color'] if self.reset_button['hover'] else self.reset_button['color']
+        # Rendering cache: text is rendered once, the parts of the window that never change live on one
+        # background surface, and each face keeps its own surface that is rebuilt only when its stickers change.
+        # draw() then touches only what changed since the previous frame and reports those rectangles.
+        self.full_redraw = True  # Repaint the whole window on the next draw()
+        self.face_surfaces = [pygame.Surface((self.cell_size * 3, self.cell_size * 3)) for _ in range(6)]
+        self.drawn_state = None  # Copy of cube.state as last drawn, to find faces whose stickers changed
+        for button in self.buttons + [self.reset_button]:
+            button['surfaces'] = self._render_button(button)  # (normal, hovered)
+            button['drawn_hover'] = None  # Hover state currently on screen
+        self.background = self._render_background()
 
-        pygame.draw.rect(self.screen, button_color, self.reset_button['rect'])  # Draw button
-        pygame.draw.rect(self.screen, self.border_color, self.reset_button['rect'], 1)  # Draw button border
+    def _render_button(self, button):
+        # Pre-render a button in its normal and hovered colors, label included
+        surfaces = []
+        for hover in (False, True):
+            if 'color' in button:
+                color = button['hover_color'] if hover else button['color']
+            else:
+                color = self.button_hover_color if hover else self.button_color
+            surface = pygame.Surface(button['rect'].size)
+            surface.fill(color)  # Draw button
+            pygame.draw.rect(surface, self.border_color, surface.get_rect(), 1)  # Draw button border
+            text = self.button_font.render(button['text'], True, self.button_text_color)  # Button text
+            surface.blit(text, text.get_rect(center=surface.get_rect().center))  # Center text
+            surfaces.append(surface)
+        return tuple(surfaces)
 
-        reset_text = self.button_font.render(self.reset_button['text'], True, (0, 0, 0))  # Button text
-        text_rect = reset_text.get_rect(center=self.reset_button['rect'].center)  # Center text
-        self.screen.blit(reset_text, text_rect)
+    def _render_background(self):
+        # Everything that never changes: background, info text, face labels and the buttons in their normal state
+        background = pygame.Surface((self.screen_width, self.screen_height))
+        background.fill(self.background_color)
 
-        # Draw info text (instructions, etc.)
-        info_text = ["Press ENTER to solve"]
-        for i, text in enumerate(info_text):
+        for i, text in enumerate(self.info_text):
             info_surface = self.info_font.render(text, True, (0, 0, 0))  # Info text
-            self.screen.blit(info_surface, (20, 20 + i * 25))
+            background.blit(info_surface, (20, 20 + i * 25))
 
-        # Draw face rotation buttons and handle hover effect
-        for button in self.buttons:
-            button['hover'] = button['rect'].collidepoint(mouse_pos)  # Check hover
-            color = self.button_hover_color if button['hover'] else self.button_color
-
-            pygame.draw.rect(self.screen, color, button['rect'])  # Draw button
-            pygame.draw.rect(self.screen, self.border_color, button['rect'], 1)  # Draw button border
+        for button in self.buttons + [self.reset_button]:
+            background.blit(button['surfaces'][0], button['rect'])
 
-            # Draw button text
-            text = self.button_font.render(button['text'], True, self.button_text_color)
-            text_rect = text.get_rect(center=button['rect'].center)  # Center text
-            self.screen.blit(text, text_rect)
-
-        # Draw cube faces
-        cube_start_x = 300  # Move cube display to the right
         for face in range(6):
-            x_offset = self.layouts[face][0] * (self.cell_size * 3 + self.margin)
-            y_offset = self.layouts[face][1] * (self.cell_size * 3 + self.margin)
-
-            # Calculate centered position for face
-            face_rect = pygame.Rect(
-                cube_start_x + x_offset,
-                self.center_y + y_offset,
-                self.cell_size * 3,
-                self.cell_size * 3
-            )
-
-            # Draw face background and border
-            pygame.draw.rect(self.screen, self.border_color, face_rect)
-
-            # Draw face label
+            face_rect = self.face_positions[face]['rect']
             label = self.font.render(self.face_labels[face], True, self.label_color)
             label_pos = (
                 face_rect.centerx - label.get_width() // 2,
                 face_rect.y - 30 if face != 5 else face_rect.y + self.cell_size * 3 + 10  # Special position for bottom label
             )
-            self.screen.blit(label, label_pos)
-
-            # Draw cells for each face (colored squares)
-            for i in range(3):
-                for j in range(3):
-                    color = self.colors[self.cube.state[face][i][j]]  # Color based on cube state
-                    rect = pygame.Rect(
-                        face_rect.x + j * self.cell_size + self.border_width,
-                        face_rect.y + i * self.cell_size + self.border_width,
-                        self.cell_size - self.border_width * 2,
-                        self.cell_size - self.border_width * 2
-                    )
-                    pygame.draw.rect(self.screen, color, rect)  # Draw cell
-                    pygame.draw.rect(self.screen, self.border_color, rect, 1)  # Draw cell border
+            background.blit(label, label_pos)
+        return background
+
+    def _render_face(self, face):
+        # Redraw the cached surface of one face from the cube state
+        surface = self.face_surfaces[face]
+        surface.fill(self.border_color)  # Face background and border
+        for i in range(3):
+            for j in range(3):
+                color = self.colors[self.cube.state[face][i][j]]  # Color based on cube state
+                rect = pygame.Rect(
+                    j * self.cell_size + self.border_width,
+                    i * self.cell_size + self.border_width,
+                    self.cell_size - self.border_width * 2,
+                    self.cell_size - self.border_width * 2
+                )
+                pygame.draw.rect(surface, color, rect)  # Draw cell
+                pygame.draw.rect(surface, self.border_color, rect, 1)  # Draw cell border
+
+    def set_status(self, message):
+        """Show message in the status line above the cube, or clear it with None"""
+        if message == self.status:
+            return
+        self.status = message
+        self.status_surface = self.status_font.render(message, True, (0, 0, 0)) if message else None
+        self.status_changed = True
+
+    def invalidate(self):
+        """Repaint the whole window on the next draw(), e.g. after the window was uncovered"""
+        self.full_redraw = True
+
+    def draw(self):
+        """Bring the screen up to date and return the rectangles that changed, for pygame.display.update()"""
+        dirty = []
+        if self.full_redraw:
+            self.screen.blit(self.background, (0, 0))
+            self.drawn_state = None
+            for button in self.buttons + [self.reset_button]:
+                button['drawn_hover'] = None
+            self.status_rect = None
+            self.status_changed = True
+
+        # Buttons whose hover state changed
+        mouse_pos = pygame.mouse.get_pos()
+        for button in self.buttons + [self.reset_button]:
+            button['hover'] = button['rect'].collidepoint(mouse_pos)  # Check hover
+            if button['hover'] != button['drawn_hover']:
+                self.screen.blit(button['surfaces'][button['hover']], button['rect'])
+                button['drawn_hover'] = button['hover']
+                dirty.append(button['rect'])
+
+        # Faces whose stickers changed
+        for face in range(6):
+            if self.drawn_state is None or not np.array_equal(self.drawn_state[face], self.cube.state[face]):
+                self._render_face(face)
+                self.screen.blit(self.face_surfaces[face], self.face_positions[face]['rect'])
+                dirty.append(self.face_positions[face]['rect'])
+        self.drawn_state = np.array(self.cube.state)
+
+        # Status line: restore the background under the old text, then draw the new one
+        if self.status_changed:
+            if self.status_rect is not None:
+                self.screen.blit(self.background, self.status_rect, self.status_rect)
+                dirty.append(self.status_rect)
+            self.status_rect = None
+            if self.status_surface is not None:
+                self.status_rect = self.screen.blit(self.status_surface, self.status_pos)
+                dirty.append(self.status_rect)
+            self.status_changed = False
+
+        if self.full_redraw:
+            self.full_redraw = False
+            return [self.screen.get_rect()]
+        return dirty
 
     def handle_input(self, event):
         if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
@@ -0,0 +1,166 @@
+"""Per-generation timers and counters for CubeSolver.
+
+    metrics = SolveMetrics(jsonl_path='solve.jsonl', trace_path='solve.trace.json')
+    solver.metrics = metrics
+    solver.solve_anytime(cube, time_budget=10)
+    metrics.close()
+
+Every generation produces one record: seconds spent applying moves, scoring fitness, selecting, crossing over
+and mutating, the evaluation and move counts, evaluations per second and the statistics of any prefix or
+solution cache. Records go to the callback, to a JSONL file, or both. The trace file is in Chrome trace event
+format and opens in chrome://tracing or https://ui.perfetto.dev. With CubeSolver.metrics left as None the
+solver uses NULL_METRICS, whose hooks do nothing.
+"""
+import contextlib
+import json
+import os
+import threading
+import time
+
+PHASES = ('moves', 'fitness', 'selection', 'crossover', 'mutation')
+
+
+class NullMetrics:
+    """Metrics sink that ignores everything, used when instrumentation is off"""
+
+    enabled = False
+    _no_phase = contextlib.nullcontext()
+
+    def phase(self, name):
+        return self._no_phase
+
+    def count(self, name, amount=1):
+        pass
+
+    def start_generation(self, generation):
+        pass
+
+    def end_generation(self, generation, best_fitness, average_fitness, solver):
+        pass
+
+    def finish(self, result, solver):
+        pass
+
+
+NULL_METRICS = NullMetrics()
+
+
+class SolveMetrics:
+    """Phase timers and counters for each generation of CubeSolver.solve_anytime.
+
+    callback(record) receives every record as a dict. jsonl_path appends one JSON object per record, and
+    trace_path writes Chrome trace events. Call close() when done (or use the object as a context manager)
+    so the files are complete.
+    """
+
+    enabled = True
+
+    def __init__(self, callback=None, jsonl_path=None, trace_path=None):
+        self.callback = callback
+        self.totals = dict.fromkeys(PHASES, 0.0)  # Seconds per phase over the generations of the current solve
+        self.counters = {}  # Counts over the generations of the current solve, e.g. evaluations and moves
+        self.last = None  # Most recent generation record
+        self._jsonl = open(jsonl_path, 'a') if jsonl_path else None
+        self._trace = open(trace_path, 'w') if trace_path else None
+        self._trace_separator = '[\n'  # Written before the next trace event
+        self._origin = time.perf_counter()
+        self.start_generation(None)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def start_generation(self, generation):
+        self._generation_start = time.perf_counter()
+        self._phases = dict.fromkeys(PHASES, 0.0)
+        self._counts = {}
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        """Time the enclosed block as part of the named phase of the current generation"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            self._phases[name] = self._phases.get(name, 0.0) + end - start
+            if self._trace:
+                self._trace_event({'name': name, 'ph': 'X', 'ts': self._micros(start), 'dur': (end - start) * 1e6})
+
+    def count(self, name, amount=1):
+        """Add to a counter of the current generation"""
+        self._counts[name] = self._counts.get(name, 0) + amount
+
+    def end_generation(self, generation, best_fitness, average_fitness, solver):
+        """Close the current generation and publish its record"""
+        end = time.perf_counter()
+        seconds = end - self._generation_start
+        evaluations = self._counts.get('evaluations', 0)
+        record = {
+            'event': 'generation',
+            'generation': generation,
+            'seconds': seconds,
+            'phases': dict(self._phases),
+            'counters': dict(self._counts),
+            'evaluations_per_second': evaluations / seconds if seconds > 0 else 0.0,
+            'best_fitness': float(best_fitness),
+            'average_fitness': float(average_fitness),
+        }
+        record.update(self._cache_stats(solver))
+        for name, value in self._phases.items():
+            self.totals[name] = self.totals.get(name, 0.0) + value
+        for name, value in self._counts.items():
+            self.counters[name] = self.counters.get(name, 0) + value
+        if self._trace:
+            self._trace_event({'name': f'generation {generation}', 'ph': 'X', 'ts': self._micros(self._generation_start),
+                               'dur': seconds * 1e6, 'args': {'best_fitness': record['best_fitness'],
+                                                              'evaluations': evaluations}})
+            self._trace_event({'name': 'evaluations_per_second', 'ph': 'C', 'ts': self._micros(end),
+                               'args': {'value': record['evaluations_per_second']}})
+        self.last = record
+        self._publish(record)
+        self.start_generation(None)
+
+    def finish(self, result, solver):
+        """Publish a summary record for a finished solve and reset the totals for the next one"""
+        record = {'event': 'solve', 'phases': dict(self.totals), 'counters': dict(self.counters)}
+        record.update((key, value) for key, value in result.stats().items() if key != 'best_fitness_history')
+        record.update(self._cache_stats(solver))
+        self._publish(record)
+        self.totals = dict.fromkeys(PHASES, 0.0)
+        self.counters = {}
+
+    def close(self):
+        if self._jsonl:
+            self._jsonl.close()
+            self._jsonl = None
+        if self._trace:
+            self._trace.write('[\n]\n' if self._trace_separator == '[\n' else '\n]\n')
+            self._trace.close()
+            self._trace = None
+
+    @staticmethod
+    def _cache_stats(solver):
+        stats = {}
+        for name in ('prefix_cache', 'solution_cache'):
+            cache = getattr(solver, name, None)
+            if cache is not None:
+                stats[name] = cache.stats()
+        return stats
+
+    def _publish(self, record):
+        if self.callback is not None:
+            self.callback(record)
+        if self._jsonl:
+            self._jsonl.write(json.dumps(record) + '\n')
+            self._jsonl.flush()
+
+    def _micros(self, moment):
+        return (moment - self._origin) * 1e6
+
+    def _trace_event(self, event):
+        event.update(cat='solver', pid=os.getpid(), tid=threading.get_ident())
+        self._trace.write(self._trace_separator + json.dumps(event))
+        self._trace_separator = ',\n'
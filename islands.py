@@ -0,0 +1,124 @@
+import copy
+import multiprocessing
+import os
+import queue
+import random
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+from cube import NO_MOVE, decode_moves, encode_moves
+
+# Per-process island context, filled in once by _init_island_worker
+_worker = {}
+
+
+class IslandModel:
+    """Run several CubeSolver populations in parallel processes, exchanging their best individuals"""
+
+    def __init__(self, solver, islands=None, migration_interval=10, migrants=2, island_size=None):
+        self.solver = solver  # Supplies the GA parameters every island runs with
+        self.islands = islands or os.cpu_count() or 1  # Number of sub-populations / worker processes
+        self.migration_interval = migration_interval  # Generations between migrations
+        self.migrants = migrants  # Individuals each island sends to its neighbour per migration
+        self.island_size = island_size  # Individuals per island, defaults to solver.population_size
+        self.seed = None  # Base seed; islands derive their own seeds from it
+
+    def solve(self, cube):
+        """Solve the cube with all islands, stopping every island as soon as one finds a solution"""
+        context = multiprocessing.get_context()
+        stop_event = context.Event()
+        inboxes = [context.Queue() for _ in range(self.islands)]  # Ring topology: island i feeds island i + 1
+
+        # Ship the solver once per worker without its solution cache or metrics sink: islands use neither, and
+        # their open files cannot be pickled into spawned workers
+        solver = copy.copy(self.solver)
+        solver.solution_cache = None
+        solver.metrics = None
+        if solver.prefix_cache is not None:  # Each island fills its own, so ship it empty
+            solver.prefix_cache = copy.copy(solver.prefix_cache)
+            solver.prefix_cache.clear()
+        if self.island_size:
+            solver.population_size = self.island_size
+
+        seeds = random.Random(self.seed).sample(range(2 ** 31), self.islands)
+        best_solution, best_fitness = [], -1
+        with ProcessPoolExecutor(max_workers=self.islands, mp_context=context,
+                                 initializer=_init_island_worker,
+                                 initargs=(solver, cube.get_state().astype(np.int8).tobytes(),
+                                           self.migration_interval, self.migrants, stop_event, inboxes)) as pool:
+            futures = [pool.submit(_run_island, island, seed) for island, seed in enumerate(seeds)]
+            for future in as_completed(futures):
+                island, solved, codes, fitness, generation = future.result()
+                if solved:
+                    stop_event.set()  # Let the other islands finish their current generation and return
+                    print(f"Solution found by island {island} in generation {generation}")
+                    return solver._optimize_solution(decode_moves(codes))
+                if fitness > best_fitness:
+                    best_fitness = fitness
+                    best_solution = decode_moves(codes)
+
+        print("No solution found")
+        return best_solution
+
+
+def _init_island_worker(solver, initial_state, migration_interval, migrants, stop_event, inboxes):
+    # Runs once per worker process so per-island tasks carry nothing but their index and seed
+    _worker.update(solver=solver, initial_state=np.frombuffer(initial_state, dtype=np.int8).reshape(6, 3, 3),
+                   migration_interval=migration_interval, migrants=migrants,
+                   stop_event=stop_event, inboxes=inboxes)
+
+
+def _run_island(island, seed):
+    # Evolve one island; returns (island, solved, best move codes, best fitness, generation)
+    random.seed(seed)
+    rng = np.random.default_rng(seed)
+    solver = _worker['solver']
+    initial_state = _worker['initial_state']
+    stop_event = _worker['stop_event']
+    inboxes = _worker['inboxes']
+    neighbour = inboxes[(island + 1) % len(inboxes)]
+
+    best_codes, best_fitness = encode_moves([]), -1.0
+    generation = -1  # Reported as is when max_generations is 0
+    codes, lengths = solver.create_population(solver.population_size, rng)
+    for generation in range(solver.max_generations):
+        if stop_event.is_set():
+            break
+
+        fitness_scores, solved = solver.evaluate_population(initial_state, codes)
+        solved_indices = np.flatnonzero(solved)
+        if solved_indices.size:
+            stop_event.set()
+            row = solved_indices[0]
+            return island, True, codes[row, :lengths[row]].copy(), float(fitness_scores[row]), generation
+
+        best_index = int(np.argmax(fitness_scores))
+        if fitness_scores[best_index] > best_fitness:
+            best_fitness = float(fitness_scores[best_index])
+            best_codes = codes[best_index, :lengths[best_index]].copy()
+
+        if generation and generation % _worker['migration_interval'] == 0:
+            _migrate(codes, lengths, fitness_scores, neighbour, inboxes[island], _worker['migrants'])
+
+        codes, lengths = solver._next_generation(codes, lengths, fitness_scores, rng)
+
+    return island, False, best_codes, best_fitness, generation
+
+
+def _migrate(codes, lengths, fitness_scores, neighbour, inbox, migrants):
+    # Send the best rows of the population matrix and replace the worst rows, in place, with any that arrived.
+    # Every island scores against the same scramble, so migrant fitness carries over unchanged.
+    order = np.argsort(fitness_scores)
+    best = order[-migrants:]
+    neighbour.put((codes[best], fitness_scores[best].astype(np.float32)))
+
+    arrivals = []
+    while True:
+        try:
+            rows, fitness = inbox.get_nowait()
+        except queue.Empty:
+            break
+        arrivals.extend(zip(rows, fitness))
+    for slot, (row, fitness) in zip(order, arrivals[-len(codes):]):
+        codes[slot] = row
+        lengths[slot] = np.count_nonzero(row != NO_MOVE)
+        fitness_scores[slot] = fitness
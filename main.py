@@ -1,9 +1,19 @@
 import pygame
+import queue
 import sys
+import threading
 from cube import RubiksCube
 from solver import CubeSolver
 from gui import CubeGUI
 
+def solve_in_background(solver, cube, updates, cancel):
+    # Worker thread: run the solver and publish its progress and final result on the updates queue
+    def progress(generation, best_fitness, avg_fitness):
+        updates.put(('progress', generation, best_fitness, avg_fitness))
+
+    solution = solver.solve(cube, progress=progress, cancel=cancel)
+    updates.put(('done', solution))
+
 def main():
     # Initialize Pygame
     pygame.init()
@@ -19,7 +29,9 @@ def main():
     solving = False  # Flag to check if the cube is being solved
     processing = False  # Flag to check if the solution is being processed
     solution = []  # List to store the sequence of moves to solve the cube
-    font = pygame.font.Font(None, 36)  # Initialize font for rendering text
+    updates = queue.Queue()  # Progress and results published by the solver thread
+    cancel = threading.Event()  # Set to stop the solver thread early
+    progress = None  # Latest (generation, best fitness, average fitness) from the solver
     
     move_delay = 0.5  # Set delay between moves when solving (in seconds)
     last_move_time = 0  # Time of the last move made
@@ -30,35 +42,49 @@ def main():
         # Event handling loop
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
+                cancel.set()  # Let a running solve stop instead of finishing in the background
                 pygame.quit()  # Exit Pygame if the window is closed
                 sys.exit()  # Exit the program
             
             if event.type == pygame.KEYDOWN:
                 # Scramble the cube when the space bar is pressed
-                if event.key == pygame.K_SPACE and not solving:
+                if event.key == pygame.K_SPACE and not solving and not processing:
                     cube.scramble()
                 # Start processing the solution when the Enter key is pressed
                 elif event.key == pygame.K_RETURN and not processing and not solving:
                     processing = True  # Flag to indicate that we are processing the solution
+                    progress = None
+                    cancel = threading.Event()
+                    snapshot = RubiksCube()  # The solver works on a copy so the display cube stays untouched
+                    snapshot.state = cube.get_state()
+                    threading.Thread(target=solve_in_background, args=(solver, snapshot, updates, cancel),
+                                     daemon=True).start()
+                # Cancel the solve in progress when Escape is pressed
+                elif event.key == pygame.K_ESCAPE and processing:
+                    cancel.set()
             
+            # The window was uncovered or restored, so its contents must be repainted
+            if event.type in (pygame.WINDOWEXPOSED, pygame.WINDOWRESTORED):
+                gui.invalidate()
+
             # Handle user input (only when not processing or solving)
             if not processing and not solving:
                 gui.handle_input(event)
         
-        screen.fill((255, 255, 255))  # Clear the screen by filling it with white
-        
-        if processing:
-            # Display the processing message while the solution is being generated
-            text = font.render("Processing... Please wait", True, (0, 0, 0))
-            screen.blit(text, (300, 50))  # Draw the text at a specific position
-            pygame.display.flip()  # Update the screen to show the text
-            
-            # Solve the cube and update the solution list
-            solution = solver.solve(cube)
-            processing = False  # Stop processing after the solution is generated
-            if solution:
-                solving = True  # Set the flag to start solving
-                last_move_time = current_time  # Record the time of the first move
+        # Collect whatever the solver thread has published since the last frame
+        while True:
+            try:
+                update = updates.get_nowait()
+            except queue.Empty:
+                break
+            if update[0] == 'progress':
+                progress = update[1:]
+            elif update[0] == 'done':
+                processing = False  # Stop processing after the solution is generated
+                solution = [] if cancel.is_set() else update[1]  # Drop the result of a cancelled solve
+                if solution:
+                    solving = True  # Set the flag to start solving
+                    last_move_time = current_time  # Record the time of the first move
         
         if solving and solution:
             # Move the cube step by step according to the solution
@@ -69,14 +95,23 @@ def main():
                 if not solution:  # If no more moves are left, stop solving
                     solving = False
         
-        gui.draw()  # Draw the current state of the cube in the GUI
-        
+        # Show live progress while the solution is being generated
+        message = None
+        if processing:
+            if cancel.is_set():
+                message = "Cancelling..."
+            elif progress is None:
+                message = "Processing... Please wait (ESC to cancel)"
+            else:
+                generation, best_fitness, avg_fitness = progress
+                message = f"Generation {generation}: best {best_fitness:.0f}, average {avg_fitness:.1f} (ESC to cancel)"
+
         # Show the remaining moves count if the cube is being solved
         if solving:
-            text = font.render(f"Solving: {len(solution)} moves remaining", True, (0, 0, 0))
-            screen.blit(text, (300, 50))  # Draw the status message
-        
-        pygame.display.flip()  # Update the screen with the new frame
+            message = f"Solving: {len(solution)} moves remaining"
+        gui.set_status(message)
+
+        pygame.display.update(gui.draw())  # Push only the parts of the window that changed to the display
         clock.tick(30)  # Control the frame rate to 30 FPS
 
 if __name__ == "__main__":
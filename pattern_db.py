@@ -0,0 +1,106 @@
+"""Pattern databases: exact distances to solved for parts of the cube, used as a CubeSolver fitness.
+
+Each table covers one pattern on one sticker orbit (the 24 corner or the 24 edge stickers): the slots holding
+a color class (a pair of opposite face colors), or the slots holding a single color. Its entry is the fewest
+quarter turns that bring that pattern home, found once by breadth-first search from the solved cube and
+stored nibble-packed, two distances per byte. The sum over all tables estimates the distance of a whole cube
+far better than counting stickers that match their center.
+
+    solver.pattern_database = PatternDatabase().load()
+"""
+import os
+import numpy as np
+from cube import MOVE_PERMUTATIONS, SOLVED_STICKERS
+from coordinates import CORNER_SLOTS, EDGE_SLOTS, bfs_distances, build_move_table, multiset_size, rank_subset
+from storage import atomic_write
+
+TABLE_VERSION = 1
+UNREACHED = 15  # Largest distance a nibble holds, also used for coordinates never reached (and any deeper)
+ORBITS = {'corner': CORNER_SLOTS, 'edge': EDGE_SLOTS}
+
+# Table name -> (orbit, colors whose slots the pattern tracks)
+PATTERNS = {}
+for _orbit in ORBITS:
+    for _pair in range(3):
+        PATTERNS[f'{_orbit}_class{_pair}'] = (_orbit, (2 * _pair, 2 * _pair + 1))
+    for _color in range(6):
+        PATTERNS[f'{_orbit}_color{_color}'] = (_orbit, (_color,))
+
+
+def pack_nibbles(values):
+    """Pack values below 16 two to a byte, the even index in the low nibble"""
+    values = np.asarray(values, dtype=np.uint8)
+    if len(values) % 2:
+        values = np.append(values, np.uint8(UNREACHED))
+    return values[0::2] | (values[1::2] << 4)
+
+
+def unpack_nibbles(packed, indices):
+    """Values at the given indices of a pack_nibbles array"""
+    indices = np.asarray(indices)
+    return (packed[indices >> 1] >> ((indices & 1) << 2).astype(np.uint8)) & 15
+
+
+def _pattern_counts(colors):
+    # Multiset counts of a pattern over a 24-slot orbit: slots outside it, then slots inside it
+    inside = 4 * len(colors)
+    return 24 - inside, inside
+
+
+class PatternDatabase:
+    """Corner- and edge-pattern distance tables, memory-mapped from table_dir, with batched lookups"""
+
+    def __init__(self, table_dir=None):
+        self.table_dir = table_dir or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tables')
+        self.tables = None  # Table name -> nibble-packed distances
+        self.ceiling = None  # Sum of the largest distance in every table, the fitness of a solved cube
+
+    def _path(self, name):
+        return os.path.join(self.table_dir, f'pattern_db_v{TABLE_VERSION}_{name}.npy')
+
+    def load(self):
+        """Memory-map the tables, generating and saving them first if they are missing, and return self"""
+        if not all(os.path.exists(self._path(name)) for name in PATTERNS):
+            self.generate_tables()
+        self.tables = {name: np.asarray(np.load(self._path(name), mmap_mode='r')) for name in PATTERNS}
+        self.ceiling = 0
+        for name, packed in self.tables.items():
+            distances = np.concatenate([packed & 15, packed >> 4])
+            self.ceiling += int(distances[distances != UNREACHED].max())
+        return self
+
+    def generate_tables(self):
+        """Build every table by breadth-first search and save it in table_dir"""
+        os.makedirs(self.table_dir, exist_ok=True)
+        for name, (orbit, colors) in PATTERNS.items():
+            counts = _pattern_counts(colors)
+            moves = build_move_table(list(MOVE_PERMUTATIONS), ORBITS[orbit], counts)
+            solved = self._coordinates(SOLVED_STICKERS[None, :], orbit, colors)
+            distances = bfs_distances(lambda coords, table: table[coords], moves, solved, multiset_size(counts))
+            with atomic_write(self._path(name)) as handle:
+                np.save(handle, pack_nibbles(np.minimum(distances, UNREACHED)))
+
+    @staticmethod
+    def _coordinates(states, orbit, colors):
+        # (N, 54) stickers -> (N,) rank of the slots of the orbit that hold one of the colors
+        return rank_subset(np.isin(states[:, ORBITS[orbit]], colors))
+
+    def distances(self, states):
+        """(N, len(PATTERNS)) quarter-turn distance of every pattern of every row of an (N, 54) state array"""
+        states = np.asarray(states).reshape(-1, 54)
+        # Rank every pattern's slot mask in one call: color masks first, class masks as unions of two of them
+        masks = []
+        for slots in ORBITS.values():
+            colors = states[:, slots] == np.arange(6, dtype=states.dtype)[:, None, None]  # (6, N, 24)
+            masks.append(np.concatenate([colors[0::2] | colors[1::2], colors]))
+        coordinates = rank_subset(np.concatenate(masks).reshape(-1, 24)).reshape(len(PATTERNS), len(states))
+        return np.stack([unpack_nibbles(self.tables[name], coordinates[index])
+                         for index, name in enumerate(PATTERNS)], axis=1)
+
+    def heuristic(self, states):
+        """Estimated distance to solved of every row of an (N, 54) state array: the sum of its pattern distances"""
+        return self.distances(states).sum(axis=1, dtype=np.int64)
+
+    def fitness(self, states):
+        """CubeSolver fitness of every row: ceiling minus the heuristic, so a solved cube scores highest"""
+        return (self.ceiling - self.heuristic(states)).astype(float)
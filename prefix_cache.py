@@ -0,0 +1,217 @@
+"""Evaluation cache of intermediate cube states keyed on move-sequence prefixes.
+
+Offspring share long prefixes with their parents: a crossover child parent1[:p] + parent2[q:] starts with p
+moves of parent1, a mutated child keeps every move before the mutation, and elites come back unchanged. A
+PrefixCache keeps the state reached after every stride-th move of the sequences it has replayed, plus the
+state at the end of each sequence, so CubeSolver.evaluate_population only replays what follows the deepest
+cached prefix of each row. Prefixes are identified by a 64-bit hash of their moves, computed for the whole
+population matrix at once, and looked up through one KeySet probe per generation. The moves left to replay
+are applied stride at a time, each block through one precomposed sticker permutation.
+
+    solver.prefix_cache = PrefixCache(max_states=100000)
+"""
+import numpy as np
+from cube import NO_MOVE, PADDED_MOVE_PERMUTATIONS
+from solver import KeySet
+
+# Unsigned type packing `stride` int8 move codes, so a row of blocks is a free view of the padded codes
+BLOCK_TYPES = {1: np.uint8, 2: np.uint16, 4: np.uint32}
+_BLOCK_PERMUTATIONS = {}  # stride -> sticker permutation of every block of that many moves, see block_permutations
+PREFIX_BASE = np.uint64(0x100000001B3)
+PREFIX_MIXERS = np.array([0x9E3779B97F4A7C15, 0xBF58476D1CE4E5B9, 0x94D049BB133111EB], dtype=np.uint64)
+
+
+def pack_blocks(codes, stride):
+    """(N, ceil(width / stride)) matrix whose entries each hold stride consecutive moves of a NO_MOVE-padded
+    move-code matrix, packed into one unsigned integer"""
+    rows, width = codes.shape
+    padded = np.full((rows, -(-width // stride) * stride), NO_MOVE, dtype=np.int8)
+    padded[:, :width] = codes
+    return padded.view(BLOCK_TYPES[stride])
+
+
+def block_permutations(stride):
+    """(13 ** stride, 54) uint8 sticker permutations of every block of stride padded move codes c, applied in
+    order, at row sum(c[k] * 13 ** k). Built on first use."""
+    if stride not in _BLOCK_PERMUTATIONS:
+        single = PADDED_MOVE_PERMUTATIONS.astype(np.uint8)
+        table = single
+        for _ in range(stride - 1):
+            # Row r * 13 + c applies move c, then the block at row r
+            table = single[np.arange(len(single))[None, :, None], table[:, None, :]].reshape(-1, 54)
+        _BLOCK_PERMUTATIONS[stride] = table
+    return _BLOCK_PERMUTATIONS[stride]
+
+
+def prefix_keys(blocks, rows, depths, stride):
+    """Nonzero 64-bit key of the first depths[i] moves of row rows[i] of pack_blocks output, for every i.
+
+    A prefix ending inside a block takes the whole block, whose moves past the end of a sequence are always
+    NO_MOVE, so only prefixes that end a sequence may do that.
+    """
+    count = blocks.shape[1]
+    powers = np.ones(count, dtype=np.uint64)
+    powers[1:] = np.cumprod(np.full(count - 1, PREFIX_BASE, dtype=np.uint64))
+    sums = np.zeros((len(blocks), count + 1), dtype=np.uint64)
+    np.cumsum(blocks.astype(np.uint64) * powers, axis=1, out=sums[:, 1:])
+    keys = sums[rows, -(-depths // stride)] ^ (depths.astype(np.uint64) * PREFIX_MIXERS[0])
+    keys ^= keys >> np.uint64(31)
+    keys *= PREFIX_MIXERS[1]
+    keys ^= keys >> np.uint64(29)
+    keys *= PREFIX_MIXERS[2]
+    keys ^= keys >> np.uint64(32)
+    keys[keys == 0] = 1
+    return keys
+
+
+class PrefixCache:
+    """Bounded store of the cube states after move-sequence prefixes of one scramble, evicting the least
+    recently used states when it is full"""
+
+    def __init__(self, max_states=100000, stride=4):
+        self.max_states = max_states  # Upper bound on stored intermediate states, about 130 bytes each
+        self.stride = stride  # Keep the state after every stride-th move (1, 2 or 4) and at the end of a sequence
+        self.clear()
+
+    def clear(self):
+        """Drop every cached state and reset the statistics"""
+        self._initial = None
+        self._index = KeySet()  # Prefix key -> slot in the arrays below
+        self._keys = np.zeros(0, dtype=np.uint64)
+        self._states = np.zeros((0, 54), dtype=np.int8)
+        self._used = np.zeros(0, dtype=np.int64)  # Replay call that last read or wrote each slot
+        self._clock = 0
+        self.hits = 0  # Whole sequence found in the cache
+        self.partial_hits = 0  # Some non-empty prefix found in the cache
+        self.misses = 0  # Replayed from the initial state
+        self.evictions = 0
+        self.moves_replayed = 0
+        self.moves_saved = 0
+
+    def __len__(self):
+        return len(self._index)
+
+    def memory_bytes(self):
+        """Bytes held by the stored states and their index"""
+        return self._keys.nbytes + self._states.nbytes + self._used.nbytes + self._index.nbytes
+
+    def stats(self):
+        """Hit/miss counts, moves saved and memory use, for sizing the cache for long runs"""
+        lookups = self.hits + self.partial_hits + self.misses
+        return {'states': len(self), 'hits': self.hits, 'partial_hits': self.partial_hits, 'misses': self.misses,
+                'hit_rate': (self.hits + self.partial_hits) / lookups if lookups else 0.0,
+                'evictions': self.evictions, 'moves_replayed': self.moves_replayed,
+                'moves_saved': self.moves_saved, 'memory_bytes': self.memory_bytes()}
+
+    def replay(self, initial_state, codes):
+        """States (N, 54) reached by applying each row of a NO_MOVE-padded move-code matrix to initial_state,
+        replaying only the moves after each row's deepest cached prefix and caching the new prefixes on the way"""
+        initial = np.asarray(initial_state, dtype=np.int8).reshape(54)
+        if self._initial is None or not np.array_equal(initial, self._initial):
+            self.clear()
+            self._initial = initial.copy()
+        self._clock += 1
+        stride = self.stride
+        rows = len(codes)
+        lengths = (codes != NO_MOVE).sum(axis=1)  # Padding only ever trails the moves
+        codes = codes[:, :max(int(lengths.max(initial=0)), 1)]
+
+        # Candidate prefixes: every stride-th move, then the whole sequence in the last column
+        checkpoints = np.arange(stride, codes.shape[1] + 1, stride)
+        depths = np.empty((rows, len(checkpoints) + 1), dtype=np.intp)
+        depths[:, :-1] = checkpoints
+        depths[:, -1] = lengths
+        usable = depths <= lengths[:, None]
+        blocks = pack_blocks(codes, stride)
+        keys = np.zeros(depths.shape, dtype=np.uint64)
+        keys[usable] = prefix_keys(blocks, np.nonzero(usable)[0], depths[usable], stride)
+        slots = np.full(depths.shape, -1)
+        slots[usable] = self._index.lookup(keys[usable])
+        cached = np.where(slots >= 0, depths, 0)
+        deepest = np.argmax(cached, axis=1)
+        start = cached[np.arange(rows), deepest]
+        found = np.flatnonzero(cached.any(axis=1))
+        hit_slots = slots[found, deepest[found]]
+        self._used[hit_slots] = self._clock
+        full = start == lengths
+        full[lengths == 0] = True  # Nothing to replay either
+        self.hits += int(full[found].sum())
+        self.partial_hits += len(found) - int(full[found].sum())
+        self.misses += rows - len(found)
+        self.moves_saved += int(start.sum())
+        self.moves_replayed += int((lengths - start).sum())
+
+        states = np.tile(initial, (rows, 1))
+        states[found] = self._states[hit_slots]
+        replay = np.flatnonzero(~full)
+        if not replay.size:
+            return states
+
+        # Replay what is left a block of stride moves at a time, through one composed permutation per distinct
+        # block. Rows are sorted longest first, so block k only touches the first moving[k] rows.
+        remaining = lengths[replay] - start[replay]
+        order = np.argsort(-remaining, kind='stable')
+        replay, remaining = replay[order], remaining[order]
+        first = start[replay] // stride
+        ends = -(-remaining // stride)
+        span = int(ends[0])
+        columns = np.minimum(first[:, None] + np.arange(span), blocks.shape[1] - 1)
+        digits = blocks[replay[:, None], columns].view(np.int8).reshape(len(replay), span, stride)
+        rows_of_blocks = digits.astype(np.intp) @ (len(PADDED_MOVE_PERMUTATIONS) ** np.arange(stride))
+        permutations = block_permutations(stride)
+        moving = np.searchsorted(-ends, -np.arange(span), side='left')  # Rows with more than k blocks left
+        reached = np.searchsorted(-remaining, -stride * np.arange(1, span + 1), side='right')  # And on a checkpoint after it
+        stickers = states[replay].reshape(-1)
+        offsets = (np.arange(len(replay)) * 54)[:, None]
+        new_keys, new_states = [], []
+        for column in range(span):
+            count = moving[column]
+            stickers[:count * 54] = stickers[offsets[:count] + permutations[rows_of_blocks[:count, column]]].reshape(-1)
+            count = reached[column]
+            checkpoint = first[:count] + column
+            missing = np.flatnonzero(slots[replay[:count], checkpoint] < 0)
+            new_keys.append(keys[replay[missing], checkpoint[missing]])
+            new_states.append(stickers[offsets[missing] + np.arange(54)])
+        replayed = stickers.reshape(-1, 54)
+        states[replay] = replayed
+        missing = np.flatnonzero(slots[replay, -1] < 0)  # Whole sequences, so unchanged copies are full hits
+        new_keys.append(keys[replay[missing], -1])
+        new_states.append(replayed[missing])
+        self._store(np.concatenate(new_keys), np.concatenate(new_states))
+        return states
+
+    def _store(self, keys, states):
+        # Add prefix states whose keys are not cached yet, evicting old ones to stay within max_states
+        keys, first = np.unique(keys, return_index=True)
+        keys, states = keys[:self.max_states], states[first[:self.max_states]]
+        count = len(self)
+        if count + len(keys) > self.max_states:
+            count = self._evict(count + len(keys) - self.max_states)
+        total = count + len(keys)
+        if total > len(self._keys):
+            capacity = min(self.max_states, max(2 * len(self._keys), total, 1024))
+            self._keys = np.resize(self._keys, capacity)
+            self._states = np.resize(self._states, (capacity, 54))
+            self._used = np.resize(self._used, capacity)
+        self._keys[count:total] = keys
+        self._states[count:total] = states
+        self._used[count:total] = self._clock
+        if count < len(self) or 4 * total > len(self._index.keys):
+            # Slots moved, or the index would pass a quarter full: rebuild it, roomier. Probing a linear-probing
+            # table takes as many rounds as its longest cluster, which stays short at this load.
+            self._index = KeySet(KeySet.capacity_for(2 * total))
+            self._index.insert(self._keys[:total], np.arange(total, dtype=np.int32))
+        else:
+            self._index.insert(keys, np.arange(count, total, dtype=np.int32))
+
+    def _evict(self, needed):
+        # Move the most recently used states to the front, dropping at least a quarter of the cache so evictions
+        # stay rare, and return how many are kept
+        count = len(self)
+        keep = np.argsort(-self._used[:count], kind='stable')[:max(count - max(needed, count // 4), 0)]
+        keep.sort()  # Survivors keep their relative order
+        self.evictions += count - len(keep)
+        self._keys[:len(keep)] = self._keys[keep]
+        self._states[:len(keep)] = self._states[keep]
+        self._used[:len(keep)] = self._used[keep]
+        return len(keep)
@@ -0,0 +1,190 @@
+import itertools
+import os
+from collections import OrderedDict
+import numpy as np
+from cube import (MOVES, MOVE_INDEX, MOVE_PERMUTATIONS, OPPOSITE_FACE, SOLVED_STICKERS, compose_moves, decode_moves,
+                  encode_moves)
+from storage import atomic_write
+
+NON_CENTER_SLOTS = np.array([i for i in range(54) if i % 9 != 4], dtype=np.intp)
+KEY_BYTES = len(NON_CENTER_SLOTS) // 2  # Two 4-bit colors per byte; centers never move so they are left out
+
+_symmetries = None
+
+
+def _propagate(face_map, signs, seeds, destinations):
+    # Extend sticker images from the seeds so that every move (f, d) is carried onto (face_map[f], signs[f] * d).
+    # Returns the 54-entry sticker map, or None if the seeds admit no such map.
+    image = np.full(54, -1, dtype=np.intp)
+    image[4::9] = [9 * face_map[face] + 4 for face in range(6)]
+    for sticker, target in seeds:
+        image[sticker] = target
+        stack = [sticker]
+        while stack:
+            source = stack.pop()
+            for (face, direction), destination in destinations.items():
+                moved = destination[source]
+                expected = destinations[(face_map[face], signs[face] * direction)][image[source]]
+                if image[moved] == -1:
+                    image[moved] = expected
+                    stack.append(moved)
+                elif image[moved] != expected:
+                    return None
+    return image
+
+
+def symmetries():
+    """Every (sticker map, face map, direction signs) that carries the move set onto itself, identity first.
+
+    A symmetry moves the sticker at slot x to slot map[x], recolors face color c as face_map[c] and turns
+    move (f, d) into (face_map[f], signs[f] * d). Found by search since the slice moves in cube.py are
+    not the physical cube's, so its rotation and reflection group does not carry over.
+    """
+    global _symmetries
+    if _symmetries is None:
+        destinations = {move: np.argsort(MOVE_PERMUTATIONS[index]) for move, index in MOVE_INDEX.items()}
+        found = []
+        for face_map in itertools.permutations(range(6)):
+            # Opposite faces commute and no other pair does, so a symmetry keeps opposite faces opposite
+            if any(face_map[OPPOSITE_FACE[face]] != OPPOSITE_FACE[face_map[face]] for face in range(6)):
+                continue
+            for signs in itertools.product((1, -1), repeat=6):
+                for corner in range(0, 54, 9):  # Sticker 0 is a corner; try every corner slot as its image
+                    for offset in (0, 2, 6, 8):
+                        if _propagate(face_map, signs, [(0, corner + offset)], destinations) is None:
+                            continue
+                        for edge in range(54):
+                            if edge % 9 not in (1, 3, 5, 7):
+                                continue
+                            image = _propagate(face_map, signs, [(0, corner + offset), (1, edge)], destinations)
+                            if image is not None and len(np.unique(image)) == 54:
+                                found.append((image, np.array(face_map, dtype=np.int8), np.array(signs)))
+        _symmetries = found
+    return _symmetries
+
+
+class SolutionCache:
+    """Persistent LRU map from scrambles to solutions, shared by scrambles equal up to symmetry and recoloring.
+
+    With a path, new solutions are written out every flush_every stores; call close() (or use the cache as a
+    context manager) so the last ones are saved too.
+    """
+
+    def __init__(self, path=None, max_entries=100000, flush_every=100):
+        self.path = path  # Backing .npz file, loaded here and rewritten by flush()
+        self.max_entries = max_entries  # Upper bound on stored solutions
+        self.flush_every = flush_every  # Stores between automatic flushes; each flush rewrites the whole file
+        self.clear()
+        symmetry_list = symmetries()
+        # Row k gathers a flat state into its k-th symmetric image: image[map[x]] = face_map[state[x]]
+        self._gathers = np.array([np.argsort(image) for image, _, _ in symmetry_list])
+        self._color_maps = np.array([face_map for _, face_map, _ in symmetry_list])
+        # Row k turns move codes of the k-th symmetric image back into codes for the original state
+        self._move_maps = np.array([[MOVE_INDEX[(int(np.flatnonzero(face_map == face)[0]),
+                                                 int(signs[face_map == face][0]) * direction)]
+                                     for face, direction in MOVES]
+                                    for _, face_map, signs in symmetry_list], dtype=np.int8)
+        if path and os.path.exists(path):
+            self.load()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def clear(self):
+        """Drop every stored solution and reset the statistics"""
+        self._entries = OrderedDict()  # Canonical key -> move codes solving the canonical state
+        self._unsaved = 0  # Stores since the file was last written
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def canonical(self, state):
+        """Return (key, k): the smallest packed key over all symmetric images and the index of that image"""
+        flat = np.asarray(state, dtype=np.int8).reshape(54)
+        images = np.take_along_axis(self._color_maps, flat[self._gathers], axis=1)[:, NON_CENTER_SLOTS]
+        packed = (images[:, 0::2] << 4 | images[:, 1::2]).astype(np.uint8)
+        keys = [row.tobytes() for row in packed]
+        index = min(range(len(keys)), key=keys.__getitem__)
+        return keys[index], index
+
+    def lookup(self, state):
+        """Return a stored solution for the state, in the state's own frame, or None"""
+        key, index = self.canonical(state)
+        codes = self._entries.get(key)
+        if codes is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return decode_moves(self._move_maps[index][codes])
+
+    def store(self, state, moves):
+        """Remember a solution for the state; ignored unless the moves really solve it"""
+        flat = np.asarray(state, dtype=np.int8).reshape(54)
+        if not np.array_equal(flat[compose_moves(moves)], SOLVED_STICKERS):
+            return False
+        key, index = self.canonical(flat)
+        # Map the solution into the canonical frame by inverting this image's move map
+        to_canonical = np.argsort(self._move_maps[index]).astype(np.int8)
+        codes = to_canonical[encode_moves(moves)]
+        stored = self._entries.get(key)
+        if stored is None or len(codes) < len(stored):
+            self._entries[key] = codes
+            self.stores += 1
+            self._unsaved += 1
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+        if self._unsaved >= self.flush_every:
+            self.flush()
+        return True
+
+    def flush(self):
+        """Write the entries to path if any were stored since the last write"""
+        if self.path and self._unsaved:
+            self.save()
+
+    def close(self):
+        self.flush()
+
+    def load(self, path=None):
+        """Read entries saved by save(), oldest first, keeping the newest max_entries"""
+        with np.load(path or self.path) as data:
+            keys, offsets, codes = data['keys'], data['offsets'], data['codes']
+        for row in range(len(keys)):
+            self._entries[keys[row].tobytes()] = codes[offsets[row]:offsets[row + 1]]
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def save(self, path=None):
+        """Write every entry, in LRU order, to an .npz file"""
+        path = path or self.path
+        solutions = list(self._entries.values())
+        offsets = np.zeros(len(solutions) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(codes) for codes in solutions])
+        keys = np.frombuffer(b''.join(self._entries), dtype=np.uint8).reshape(-1, KEY_BYTES)
+        codes = np.concatenate(solutions) if solutions else np.zeros(0, dtype=np.int8)
+        with atomic_write(path) as handle:
+            np.savez(handle, keys=keys, offsets=offsets, codes=codes)
+        if path == self.path:
+            self._unsaved = 0
+
+    def stats(self):
+        """Hit/miss counts and size, for judging whether the cache pays for itself"""
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'stores': self.stores,
+            'evictions': self.evictions,
+            'entries': len(self._entries),
+        }
@@ -0,0 +1,258 @@
+"""Local solve service: one process pool serving many clients over HTTP or a Unix socket.
+
+    python solve_service.py --port 8765 --engine ga --workers 4 --time-budget 5
+    curl -d '{"moves": "F R U2"}' http://127.0.0.1:8765/solve
+    curl http://127.0.0.1:8765/stats
+
+POST /solve takes the same JSON records as batch_solve.py ("moves" or "state", optional "id") and answers
+with the same result fields. Requests for a cube state that is already being solved wait for that solve
+instead of starting another. When every worker is busy, queued requests are handed to the next free worker
+together, up to --batch-size at a time, and the ga engine solves such a batch as one run of
+CubeSolver.solve_many. Once --queue-size requests are waiting new ones are turned away with 503 so clients
+can back off. If a worker process dies, the requests it was solving get 500 and the pool is started afresh.
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import batch_solve
+
+MAX_BODY_BYTES = 1 << 16
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 413: 'Payload Too Large',
+           500: 'Internal Server Error', 503: 'Service Unavailable'}
+
+
+class ServiceBusy(Exception):
+    """Raised by SolveService.solve when its queue is full"""
+
+
+def _solve_batch(lines):
+    # Runs in a worker process set up by batch_solve._init_worker
+    return batch_solve.solve_batch([(0, line) for line in lines])
+
+
+class SolveService:
+    """Queue, deduplicate and batch solve requests onto a pool of solver processes"""
+
+    def __init__(self, engine='ga', workers=None, queue_size=256, batch_size=8, **options):
+        self.engine = engine  # One of batch_solve.ENGINES
+        self.workers = workers or os.cpu_count() or 1
+        self.queue_size = queue_size  # Requests allowed to wait for a worker before new ones get 503
+        self.batch_size = batch_size  # Most queued requests handed to a worker as one task
+        self.options = options  # Passed to batch_solve._init_worker, e.g. time_budget or table_dir
+        self.requests = 0
+        self.deduplicated = 0  # Requests answered by an identical solve already in flight
+        self.rejected = 0
+        self.batches = 0
+        self.batched_requests = 0
+        self.pool_restarts = 0  # Times a worker died and the pool was replaced
+        self._pool = None
+        self._queue = None
+        self._slots = None
+        self._in_flight = {}  # Cube state bytes -> future of its result
+        self._dispatcher = None
+
+    async def start(self):
+        """Start the worker processes and the dispatcher; call before solve()"""
+        await asyncio.to_thread(batch_solve.prepare_tables, self.engine, self.options)
+        self._start_pool()
+        self._queue = asyncio.Queue(self.queue_size)
+        self._slots = asyncio.Semaphore(self.workers)  # One task per worker; the rest wait in the queue
+        self._dispatcher = asyncio.create_task(self._dispatch())
+
+    def _start_pool(self):
+        # Spawned rather than forked, so workers never inherit (and hold open) client connection sockets
+        self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context('spawn'),
+                                         initializer=batch_solve._init_worker, initargs=(self.engine, self.options))
+
+    async def stop(self):
+        """Stop the dispatcher and the workers, failing every request still waiting for a result"""
+        self._dispatcher.cancel()
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        for future in self._in_flight.values():
+            if not future.done():
+                future.set_exception(RuntimeError('solve service stopped'))
+        self._in_flight.clear()
+
+    async def solve(self, record):
+        """Solve one request record and return its result dict. Raises ValueError for a malformed record
+        and ServiceBusy when the queue is full."""
+        cube = batch_solve._parse_cube(record)
+        key = cube.state.tobytes()
+        self.requests += 1
+        future = self._in_flight.get(key)
+        if future is not None:
+            self.deduplicated += 1
+        elif self._queue.full():
+            self.rejected += 1
+            raise ServiceBusy()
+        else:
+            future = asyncio.get_running_loop().create_future()
+            self._in_flight[key] = future
+            self._queue.put_nowait((key, json.dumps({'state': cube.state.reshape(54).tolist()}), future))
+        result = dict(await asyncio.shield(future))  # A client hanging up must not cancel a shared solve
+        del result['line']
+        if 'id' in record:
+            result['id'] = record['id']
+        return result
+
+    def stats(self):
+        return {
+            'requests': self.requests,
+            'deduplicated': self.deduplicated,
+            'rejected': self.rejected,
+            'batches': self.batches,
+            'batched_requests': self.batched_requests,
+            'pool_restarts': self.pool_restarts,
+            'queued': self._queue.qsize() if self._queue else 0,
+            'in_flight': len(self._in_flight),
+        }
+
+    async def _dispatch(self):
+        # Wait for a free worker, then give it the oldest request and whatever else is queued, up to batch_size
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._slots.acquire()
+            jobs = [await self._queue.get()]
+            while len(jobs) < self.batch_size and not self._queue.empty():
+                jobs.append(self._queue.get_nowait())
+            self.batches += 1
+            self.batched_requests += len(jobs)
+            try:
+                task = loop.run_in_executor(self._pool, _solve_batch, [line for _, line, _ in jobs])
+            except BrokenProcessPool as error:
+                # The pool broke before _finish of the task that broke it could replace it: fail these jobs the
+                # same way, which also releases the slot and starts a new pool
+                task = loop.create_future()
+                task.set_exception(error)
+                self._finish(task, jobs, self._pool)
+                continue
+            task.add_done_callback(lambda task, jobs=jobs, pool=self._pool: self._finish(task, jobs, pool))
+
+    def _finish(self, task, jobs, pool):
+        self._slots.release()
+        error = RuntimeError('solve cancelled') if task.cancelled() else task.exception()
+        if isinstance(error, BrokenProcessPool) and pool is self._pool:
+            # A worker died (killed, or out of memory); every later task on this pool would fail the same way
+            pool.shutdown(wait=False, cancel_futures=True)
+            self._start_pool()
+            self.pool_restarts += 1
+        for index, (key, _, future) in enumerate(jobs):
+            self._in_flight.pop(key, None)
+            if future.done():
+                continue  # Already failed by stop()
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(task.result()[index])
+
+    async def handle_connection(self, reader, writer):
+        """Serve HTTP/1.1 requests on one connection until the client closes it"""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, target, version = request_line.decode('latin-1').split()
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get('content-length', 0))
+                keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+                if length > MAX_BODY_BYTES:
+                    status, payload, keep_alive = 413, {'error': 'request body too large'}, False
+                else:
+                    body = await reader.readexactly(length)
+                    try:
+                        status, payload = await self._route(method, target, body)
+                    except Exception as error:  # Answer rather than drop the connection with an empty reply
+                        status, payload, keep_alive = 500, {'error': f'internal error: {error!r}'}, False
+                self._respond(writer, status, payload, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass  # Malformed request line or headers, or the client went away
+        finally:
+            writer.close()
+
+    async def _route(self, method, target, body):
+        path = target.split('?', 1)[0]
+        if path == '/stats':
+            return (200, self.stats()) if method == 'GET' else (405, {'error': 'use GET'})
+        if path != '/solve':
+            return 404, {'error': f'no such endpoint {path}'}
+        if method != 'POST':
+            return 405, {'error': 'use POST'}
+        try:
+            record = json.loads(body)
+            if not isinstance(record, dict):
+                raise ValueError('request body must be a JSON object')
+            return 200, await self.solve(record)
+        except ServiceBusy:
+            return 503, {'error': 'too many queued requests, retry later'}
+        except (ValueError, KeyError, TypeError) as error:
+            return 400, {'error': str(error)}
+        except RuntimeError as error:  # BrokenProcessPool when a worker died, or the service stopping
+            return 500, {'error': f'solve failed, retry later: {error}'}
+
+    @staticmethod
+    def _respond(writer, status, payload, keep_alive):
+        body = json.dumps(payload).encode()
+        head = [f'HTTP/1.1 {status} {REASONS[status]}', 'Content-Type: application/json',
+                f'Content-Length: {len(body)}', f'Connection: {"keep-alive" if keep_alive else "close"}']
+        if status == 503:
+            head.append('Retry-After: 1')
+        writer.write(('\r\n'.join(head) + '\r\n\r\n').encode() + body)
+
+
+async def serve(service, host='127.0.0.1', port=8765, unix_path=None):
+    """Run the service until cancelled, listening on a Unix socket when unix_path is given, else on host:port"""
+    await service.start()
+    if unix_path:
+        server = await asyncio.start_unix_server(service.handle_connection, unix_path)
+    else:
+        server = await asyncio.start_server(service.handle_connection, host, port)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await service.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Serve cube solves over HTTP to local clients')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--unix', help='listen on this Unix socket path instead of a TCP port')
+    parser.add_argument('--engine', choices=batch_solve.ENGINES, default='ga')
+    parser.add_argument('--workers', type=int, default=0, help='worker processes (0 for one per CPU)')
+    parser.add_argument('--queue-size', type=int, default=256, help='waiting requests before answering 503')
+    parser.add_argument('--batch-size', type=int, default=8, help='most queued requests sent to a worker at once')
+    parser.add_argument('--time-budget', type=float, help='seconds per solve for the ga and two-phase engines')
+    parser.add_argument('--max-evaluations', type=int, help='evaluations per solve for the ga engine')
+    parser.add_argument('--table-dir', help='pruning table directory for the two-phase engine and --pattern-db')
+    parser.add_argument('--memory-limit', type=float, help='megabytes of search state for the bidirectional engine')
+    parser.add_argument('--pattern-db', action='store_true', help='score the ga engine with pattern databases')
+    parser.add_argument('--adaptive', action='store_true', help='let the ga engine adapt its parameters during each run')
+    args = parser.parse_args(argv)
+
+    service = SolveService(args.engine, args.workers or None, args.queue_size, args.batch_size,
+                           time_budget=args.time_budget, max_evaluations=args.max_evaluations,
+                           table_dir=args.table_dir, memory_limit=args.memory_limit, pattern_db=args.pattern_db,
+                           adaptive=args.adaptive)
+    try:
+        asyncio.run(serve(service, args.host, args.port, args.unix))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,167 @@
 import numpy as np
 import random
-from cube import RubiksCube
+import time
+from cube import (CANONICAL_START, CANONICAL_SUCCESSORS, MOVES, MOVE_INDEX, MOVE_PERMUTATIONS, MOVED_STICKERS,
+                  MOVE_SOURCES, PADDED_MOVED_STICKERS, PADDED_MOVE_SOURCES, RubiksCube, NO_MOVE, SOLVED_STICKERS,
+                  apply_move_codes, canonical_next, canonical_states, decode_moves, encode_moves, encode_population,
+                  random_canonical_codes, simplify_moves, validate_states)
+from adaptive import AdaptiveControl
+from checkpoint import Checkpoint
+from instrumentation import NULL_METRICS
+
+# Cell positions within a face when its 3x3 grid is flattened row by row
+CORNER_CELLS = [0, 2, 6, 8]
+EDGE_CELLS = [1, 3, 5, 7]
+CENTER_CELL = 4
+
+# Hashed state keys: the 48 non-center stickers as three exact 48-bit words of 3-bit colors, mixed into 64 bits
+KEY_SLOTS = np.array([slot for slot in range(54) if slot % 9 != CENTER_CELL]).reshape(3, 16)
+KEY_SHIFTS = (3 * np.arange(16)).astype(np.uint64)
+KEY_MULTIPLIERS = np.array([0x9E3779B97F4A7C15, 0xC2B2AE3D27D4EB4F, 0x165667B19E3779F9], dtype=np.uint64)
+EXPAND_CHUNK = 16384  # Frontier states expanded together by a bidirectional search
+
+
+def state_keys(states):
+    """64-bit hashed key of every row of an (N, 54) state array; never 0, which marks an empty KeySet slot"""
+    words = (states[:, KEY_SLOTS].astype(np.uint64) << KEY_SHIFTS).sum(axis=2)
+    keys = (words[:, 0] * KEY_MULTIPLIERS[0]) ^ (words[:, 1] * KEY_MULTIPLIERS[1]) ^ (words[:, 2] * KEY_MULTIPLIERS[2])
+    keys ^= keys >> np.uint64(29)
+    keys *= KEY_MULTIPLIERS[1]
+    keys ^= keys >> np.uint64(32)
+    keys[keys == 0] = 1
+    return keys
+
+
+class KeySet:
+    """Open-addressing hash set of nonzero uint64 keys, each with an int32 value, held in two flat arrays.
+    Lookups and inserts take whole key arrays and probe them all at once."""
+
+    def __init__(self, capacity=1024):
+        self.keys = np.zeros(capacity, dtype=np.uint64)  # Capacity is a power of two; 0 marks an empty slot
+        self.values = np.zeros(capacity, dtype=np.int32)
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    @property
+    def nbytes(self):
+        return self.keys.nbytes + self.values.nbytes
+
+    @staticmethod
+    def capacity_for(size):
+        # Smallest power of two keeping the load factor at or below one half
+        return max(1024, 1 << int(2 * size - 1).bit_length())
+
+    def _probe(self, keys):
+        # Slot holding each key, or the empty slot where linear probing would put it
+        mask = len(self.keys) - 1
+        slots = (keys & np.uint64(mask)).astype(np.intp)
+        pending = np.arange(len(keys))
+        while pending.size:
+            stored = self.keys[slots[pending]]
+            pending = pending[(stored != keys[pending]) & (stored != 0)]
+            slots[pending] = (slots[pending] + 1) & mask
+        return slots
+
+    def lookup(self, keys):
+        """Value stored for each key, -1 where the key is absent"""
+        slots = self._probe(keys)
+        return np.where(self.keys[slots] == keys, self.values[slots], -1)
+
+    def insert(self, keys, values):
+        """Add distinct keys that are not in the set yet"""
+        if 2 * (self.size + len(keys)) > len(self.keys):
+            old_keys, old_values = self.keys[self.keys != 0], self.values[self.keys != 0]
+            self.keys = np.zeros(self.capacity_for(self.size + len(keys)), dtype=np.uint64)
+            self.values = np.zeros(len(self.keys), dtype=np.int32)
+            self.size = 0
+            self.insert(old_keys, old_values)
+        pending = np.arange(len(keys))
+        while pending.size:
+            slots = self._probe(keys[pending])
+            self.keys[slots] = keys[pending]  # Keys racing for one empty slot: the last write wins, the rest probe on
+            won = self.keys[slots] == keys[pending]
+            self.values[slots[won]] = values[pending[won]]
+            pending = pending[~won]
+        self.size += len(keys)
+
+class SolveResult:
+    """Best sequence found by CubeSolver.solve_anytime (or for one cube of solve_many) and statistics about the run"""
+
+    def __init__(self):
+        self.solution = []  # Solving sequence if solved, otherwise the fittest sequence seen
+        self.solved = False
+        self.stop_reason = None  # 'solved', 'cache', 'invalid_state', 'time_budget', 'evaluation_budget', ...
+        self.best_fitness = None
+        self.generations = 0  # Generations evaluated
+        self.evaluations = 0  # Individuals scored
+        self.elapsed = 0.0  # Wall-clock seconds
+        self.history = []  # (elapsed seconds, evaluations, best fitness) each time the best fitness improved
+
+    def finish(self, solution, solved, stop_reason, elapsed):
+        self.solution = solution
+        self.solved = solved
+        self.stop_reason = stop_reason
+        self.elapsed = elapsed
+
+    @property
+    def evaluations_per_second(self):
+        return self.evaluations / self.elapsed if self.elapsed > 0 else 0.0
+
+    def stats(self):
+        """Plain-dict summary of the run, e.g. for logging as JSON"""
+        return {
+            'solved': self.solved,
+            'stop_reason': self.stop_reason,
+            'solution_length': len(self.solution),
+            'best_fitness': self.best_fitness,
+            'generations': self.generations,
+            'evaluations': self.evaluations,
+            'elapsed': self.elapsed,
+            'evaluations_per_second': self.evaluations_per_second,
+            'best_fitness_history': [list(entry) for entry in self.history],
+        }
+
+class FitnessTracker:
+    """A cube state kept together with the counts its fitness is made of.
+
+    make_move only looks at the 20 stickers the move changes, so the fitness after every move of a sequence
+    costs the same small amount however the state was reached. Centers never move, so whether a sticker
+    matches its face is fixed by the centers of the starting state.
+    """
+
+    def __init__(self, solver, state):
+        self.solver = solver
+        self.stickers = np.array(state, dtype=np.int8).reshape(54)
+        self._targets = np.repeat(self.stickers[CENTER_CELL::9], 9)  # Color each slot needs to match its face
+        self._corner_slots = np.isin(np.arange(54) % 9, CORNER_CELLS)
+        matches = self.stickers == self._targets
+        self.corner_matches = int(matches[self._corner_slots].sum())
+        self.edge_matches = int(matches.sum()) - self.corner_matches - 6  # Centers always match themselves
+        self.center_matches = int((self.stickers[CENTER_CELL::9] == np.arange(6)).sum())
+
+    @property
+    def fitness(self):
+        # Same weighting as CubeSolver.evaluate_fitness
+        solver = self.solver
+        return (self.corner_matches * (solver.corner_weight + solver.corner_alignment_weight)
+                + self.edge_matches * (solver.edge_weight + solver.cross_weight + solver.edge_alignment_weight)
+                + self.center_matches * solver.center_weight)
+
+    def make_move(self, move):
+        index = MOVE_INDEX[move]
+        slots = MOVED_STICKERS[index]
+        targets = self._targets[slots]
+        gained = (self.stickers[MOVE_SOURCES[index]] == targets).astype(np.int8) - (self.stickers[slots] == targets)
+        self.stickers[slots] = self.stickers[MOVE_SOURCES[index]]
+        corners = int(gained[self._corner_slots[slots]].sum())
+        self.corner_matches += corners
+        self.edge_matches += int(gained.sum()) - corners
+
+    def is_solved(self):
+        return self.corner_matches == 24 and self.edge_matches == 24 and self.center_matches == 6
+
 
 class CubeSolver:
     def __init__(self):
@@ -11,7 +172,21 @@ class CubeSolver:
         self.max_generations = 200  # Increased maximum number of generations
         self.mutation_rate = 0.1  # Probability of mutation
         self.elite_size = 10  # Number of elite individuals to carry over to the next generation
+        self.tournament_size = 3  # Contestants drawn per parent in tournament selection
+        self.selection_pressure = 1.0  # Chance the fittest contestant wins; else the next fittest gets the same chance
         self.max_sequence_length = 50  # Maximum length of a sequence of moves
+        self.canonical_moves = True  # Only generate and keep sequences in cube.simplify_moves form
+        self.batch_evaluation = True  # Evaluate the whole population as one (population x 54) array
+        self.solution_cache = None  # Optional SolutionCache consulted before, and filled after, every solve
+        self.prefix_cache = None  # Optional PrefixCache so offspring only replay the moves that differ from a parent
+        self.best_prefix = False  # Score each sequence by its fittest prefix and cut it there
+        self.pattern_database = None  # Optional loaded pattern_db.PatternDatabase whose distance estimate replaces sticker matching as the fitness
+        self.metrics = None  # Optional instrumentation.SolveMetrics receiving per-generation phase timings and counters
+        self.checkpoint_path = None  # Where solve_anytime saves a Checkpoint every checkpoint_interval generations
+        self.checkpoint_interval = 10
+        self.adaptive = False  # Let an AdaptiveControl tune mutation rate, tournament size and population size during each run
+        self.stall_generations = 15  # Generations without a better best fitness before an adaptive run partially restarts
+        self.restart_fraction = 0.5  # Share of the non-elite population an adaptive restart replaces
         # Reward parameters for evaluating fitness
         self.corner_weight = 4.0
         self.edge_weight = 2.0
@@ -72,14 +247,239 @@ class CubeSolver:
             alignment_score += sum(e == center for e in edges)
         return alignment_score
 
+    def evaluate_fitness_batch(self, states):
+        """Calculate the weighted fitness of every row of an (N, 54) state array"""
+        faces = states.reshape(len(states), 6, 9)
+        centers = faces[:, :, CENTER_CELL]
+        matches = faces == centers[:, :, None]  # Sticker matches the center of its face
+        corner_matches = matches[:, :, CORNER_CELLS].sum(axis=(1, 2))
+        edge_matches = matches[:, :, EDGE_CELLS].sum(axis=(1, 2))
+
+        score = corner_matches * self.corner_weight
+        score = score + edge_matches * self.edge_weight
+        score = score + (centers == np.arange(6)).sum(axis=1) * self.center_weight
+        # Cross, corner alignment and edge alignment terms, matching their per-state counterparts
+        score = score + edge_matches * self.cross_weight
+        score = score + corner_matches * self.corner_alignment_weight
+        score = score + edge_matches * self.edge_alignment_weight
+        return score
+
+    def sticker_weights(self):
+        """Fitness each sticker slot adds when it matches its face's center (0 for the centers themselves)"""
+        weights = np.zeros(54)
+        weights[np.isin(np.arange(54) % 9, CORNER_CELLS)] = self.corner_weight + self.corner_alignment_weight
+        weights[np.isin(np.arange(54) % 9, EDGE_CELLS)] = self.edge_weight + self.cross_weight + self.edge_alignment_weight
+        return weights
+
+    def evaluate_prefixes(self, initial_state, codes):
+        """Fitness and solved flag after every prefix of every row of a move-code matrix.
+
+        Returns two (N, width + 1) arrays whose column k describes the state after the first k moves. Each
+        move only rewrites and rescores the 20 stickers it changes, across all rows at once.
+        """
+        rows, width = codes.shape
+        flat = initial_state.reshape(54).astype(np.int8)
+        targets = np.repeat(flat[CENTER_CELL::9], 9)
+        weights = self.sticker_weights()
+        matches = flat == targets
+        base = (flat[CENTER_CELL::9] == np.arange(6)).sum() * self.center_weight
+
+        fitness = np.empty((rows, width + 1))
+        mismatches = np.empty((rows, width + 1), dtype=np.int16)
+        fitness[:, 0] = base + matches @ weights
+        mismatches[:, 0] = 54 - matches.sum()
+        stickers = np.tile(flat, rows)  # All rows back to back, addressed as row * 54 + slot
+        offsets = np.arange(rows)[:, None] * 54
+        for column in range(width):
+            move = codes[:, column]
+            slots = PADDED_MOVED_STICKERS[move]
+            wanted = targets[slots]
+            destination = offsets + slots
+            moved_in = stickers[offsets + PADDED_MOVE_SOURCES[move]]
+            gained = (moved_in == wanted).astype(np.int8) - (stickers[destination] == wanted)
+            stickers[destination] = moved_in
+            fitness[:, column + 1] = fitness[:, column] + (gained * weights[slots]).sum(axis=1)
+            mismatches[:, column + 1] = mismatches[:, column] - gained.sum(axis=1)
+        solved = (mismatches == 0) & np.array_equal(flat[CENTER_CELL::9], np.arange(6))
+        return fitness, solved
+
+    def _evaluate_best_prefixes(self, initial_state, codes, lengths):
+        """Score each row by its fittest non-empty prefix, preferring a solving one, and cut the row there.
+        Changes codes and lengths in place and returns (fitness_scores, solved)."""
+        fitness, solved = self.evaluate_prefixes(initial_state, codes)
+        ranked = np.where(solved, np.inf, fitness)[:, 1:]
+        best = np.argmax(ranked, axis=1) + 1  # First, so shortest, of the equally fit prefixes
+        best = np.minimum(best, np.maximum(lengths, 1))  # Padding repeats the last score; never pick past the end
+        rows = np.arange(len(codes))
+        codes[np.arange(codes.shape[1]) >= best[:, None]] = NO_MOVE
+        lengths[:] = np.minimum(lengths, best)
+        return fitness[rows, best], solved[rows, best]
+
+    def evaluate_population(self, initial_state, population):
+        """Replay every individual from initial_state at once and score the results.
+
+        population is either a padded move-code matrix, as built by create_population, or a list of move lists.
+        """
+        metrics = self.metrics or NULL_METRICS
+        codes = population if isinstance(population, np.ndarray) else encode_population(population)
+        with metrics.phase('moves'):
+            if self.prefix_cache is not None:
+                states = self.prefix_cache.replay(initial_state, codes)
+            else:
+                states = np.tile(initial_state.reshape(1, 54), (len(codes), 1))
+                states = apply_move_codes(states, codes)
+        with metrics.phase('fitness'):
+            solved = (states == SOLVED_STICKERS).all(axis=1)
+            if self.pattern_database is not None:
+                return self.pattern_database.fitness(states), solved
+            return self.evaluate_fitness_batch(states), solved
+
+    def create_population(self, size, rng):
+        """Create (codes, lengths): size random sequences as a (size, max_sequence_length) int8 matrix padded
+        with NO_MOVE, and their lengths"""
+        width = self.max_sequence_length
+        lengths = rng.integers(1, width + 1, size)
+        if self.canonical_moves:
+            codes = random_canonical_codes(size, width, rng)
+        else:
+            codes = rng.integers(0, len(MOVES), (size, width)).astype(np.int8)
+        codes[np.arange(width) >= lengths[:, None]] = NO_MOVE
+        return codes, lengths
+
+    def mutate_population(self, codes, lengths, rng, mutation_rate=None):
+        """Matrix version of mutate: each row is changed, extended or shortened at one random position
+        with probability mutation_rate (the attribute unless given). Works in place and returns (codes, lengths).
+
+        With canonical_moves the new move is drawn among those keeping the row canonical, and a removal also
+        drops the following moves that would not join canonically.
+        """
+        rows = len(codes)
+        width = codes.shape[1]
+        columns = np.arange(width)
+        mutated = rng.random(rows) < (self.mutation_rate if mutation_rate is None else mutation_rate)
+        kind = rng.integers(0, 3, rows)  # 0 change, 1 add, 2 remove
+        new_moves = rng.integers(0, len(MOVES), rows).astype(np.int8)
+        prefix_states = canonical_states(codes) if self.canonical_moves else None
+
+        def following(selected, position, count):
+            # The `count` move columns starting at position, NO_MOVE past the matrix width
+            return [np.where(position + k < width, codes[selected, np.minimum(position + k, width - 1)], NO_MOVE)
+                    for k in range(count)]
+
+        change = np.flatnonzero(mutated & (kind == 0) & (lengths > 0))
+        position = rng.integers(0, lengths[change])
+        if self.canonical_moves:
+            new_moves[change], possible = self._canonical_choice(prefix_states[change, position],
+                                                                 following(change, position + 1, 2), rng)
+            change, position = change[possible], position[possible]
+        codes[change, position] = new_moves[change]
+
+        add = np.flatnonzero(mutated & (kind == 1) & (lengths < self.max_sequence_length))
+        position = rng.integers(0, lengths[add] + 1)
+        if self.canonical_moves:
+            new_moves[add], possible = self._canonical_choice(prefix_states[add, position],
+                                                              following(add, position, 2), rng)
+            add, position = add[possible], position[possible]
+        if add.size:
+            position = position[:, None]
+            shifted = codes[add[:, None], np.maximum(columns - 1, 0)]  # Everything after the insert moves right
+            codes[add] = np.where(columns < position, codes[add],
+                                  np.where(columns == position, new_moves[add, None], shifted))
+            lengths[add] += 1
+
+        remove = np.flatnonzero(mutated & (kind == 2) & (lengths > 1))
+        if remove.size:
+            position = rng.integers(0, lengths[remove])
+            resume = position + 1
+            if self.canonical_moves:
+                resume = self._canonical_tail_cut(prefix_states[remove, position], codes[remove], lengths[remove], resume)
+            source = np.where(columns < position[:, None], columns, columns - position[:, None] + resume[:, None])
+            shifted = np.where(source < width, codes[remove[:, None], np.minimum(source, width - 1)], NO_MOVE)
+            codes[remove] = shifted
+            lengths[remove] -= resume - position
+        return codes, lengths
+
+    @staticmethod
+    def _canonical_choice(states, following, rng):
+        # A random move for each row that may follow its generator state and be followed by the `following`
+        # move columns with the row staying canonical, and whether the row has any such move
+        candidates = np.arange(len(MOVES))
+        allowed = CANONICAL_SUCCESSORS[states[:, None], candidates]
+        states = canonical_next(states[:, None], candidates)
+        for column in following:
+            allowed &= CANONICAL_SUCCESSORS[states, column[:, None]]
+            states = canonical_next(states, column[:, None])
+        counts = allowed.sum(axis=1)
+        picks = rng.integers(0, np.maximum(counts, 1))
+        return np.argmax(np.cumsum(allowed, axis=1) > picks[:, None], axis=1).astype(np.int8), counts > 0
+
+    @staticmethod
+    def _canonical_tail_cut(states, tail, tail_lengths, tail_cut):
+        # Advance each tail_cut past tail moves until tail[tail_cut:] joins canonically onto a canonical head ending
+        # in the given generator state. Both parts are canonical, so only the first two joined moves can clash.
+        rows = np.arange(len(tail))
+        width = tail.shape[1]
+        tail_cut = tail_cut.copy()
+        while True:
+            joined = [np.where(tail_cut + k < tail_lengths, tail[rows, np.minimum(tail_cut + k, width - 1)], NO_MOVE)
+                      for k in range(2)]
+            clash = ~(CANONICAL_SUCCESSORS[states, joined[0]]
+                      & CANONICAL_SUCCESSORS[canonical_next(states, joined[0]), joined[1]])
+            if not clash.any():
+                return tail_cut
+            tail_cut[clash] += 1
+
+    def crossover_population(self, first, first_lengths, second, second_lengths, rng):
+        """Matrix version of crossover on paired parent rows. Returns (codes, lengths) holding each pair's
+        two children in consecutive rows; children are cut to the matrix width. With canonical_moves a
+        child's tail starts past any moves that would not join its head canonically."""
+        width = first.shape[1]
+        columns = np.arange(width)
+        rows = np.arange(len(first))[:, None]
+        cut1 = rng.integers(0, first_lengths + 1)
+        cut2 = rng.integers(0, second_lengths + 1)
+        tail1, tail2 = cut1, cut2
+        if self.canonical_moves:
+            tail2 = self._canonical_tail_cut(canonical_states(first)[rows[:, 0], cut1], second, second_lengths, cut2)
+            tail1 = self._canonical_tail_cut(canonical_states(second)[rows[:, 0], cut2], first, first_lengths, cut1)
+
+        def splice(head, head_cut, tail, tail_lengths, tail_cut):
+            # head[:head_cut] + tail[tail_cut:], padded with NO_MOVE
+            source = np.clip(columns - head_cut[:, None] + tail_cut[:, None], 0, width - 1)
+            length = np.minimum(head_cut + tail_lengths - tail_cut, width)
+            child = np.where(columns < head_cut[:, None], head, tail[rows, source])
+            child[columns >= length[:, None]] = NO_MOVE
+            return child, length
+
+        child1, length1 = splice(first, cut1, second, second_lengths, tail2)
+        child2, length2 = splice(second, cut2, first, first_lengths, tail1)
+        # An empty parent makes both children plain copies, as in crossover
+        empty = (first_lengths == 0) | (second_lengths == 0)
+        child1[empty], length1[empty] = first[empty], first_lengths[empty]
+        child2[empty], length2[empty] = second[empty], second_lengths[empty]
+
+        codes = np.stack([child1, child2], axis=1).reshape(-1, width)
+        lengths = np.stack([length1, length2], axis=1).reshape(-1)
+        return codes.astype(np.int8), lengths
+
     def create_individual(self):
         """Create a random sequence of moves"""
         length = random.randint(1, self.max_sequence_length)
-        
-        return [random.choice(self.moves) for _ in range(length)]
+        if not self.canonical_moves:
+            return [random.choice(self.moves) for _ in range(length)]
+
+        # Only pick moves the canonical rules allow after the previous one
+        individual = []
+        state = CANONICAL_START
+        for _ in range(length):
+            code = random.choice(np.flatnonzero(CANONICAL_SUCCESSORS[state, :len(MOVES)]))
+            individual.append(self.moves[code])
+            state = int(canonical_next(state, code))
+        return individual
 
     def mutate(self, individual):
-        """Mutate a solution by changing, adding, or removing moves"""
+        """Mutate a solution by changing, adding, or removing moves (per-individual form of mutate_population).
+        With canonical_moves the result is rewritten into canonical form."""
         if random.random() < self.mutation_rate:
             mutation_type = random.choice(['change', 'add', 'remove'])
             if mutation_type == 'change' and len(individual) > 0:
@@ -91,10 +491,12 @@ class CubeSolver:
             elif mutation_type == 'remove' and len(individual) > 1:
                 pos = random.randint(0, len(individual) - 1)
                 individual.pop(pos)
+            if self.canonical_moves:
+                individual[:] = simplify_moves(individual)
         return individual
 
     def crossover(self, parent1, parent2):
-        """Perform crossover between two parents"""
+        """Perform crossover between two parents (per-pair form of crossover_population)"""
         if len(parent1) == 0 or len(parent2) == 0:
             return parent1.copy(), parent2.copy()
         
@@ -106,78 +508,582 @@ class CubeSolver:
         
         return child1, child2
 
-    def solve(self, cube):
-        best_solution = None
+    def solve(self, cube, progress=None, cancel=None):
+        """Evolve move sequences for the cube. progress(generation, best_fitness, avg_fitness) replaces the
+        console prints when given; setting the cancel event stops the run with the best sequence so far."""
+        return self.solve_anytime(cube, progress=progress, cancel=cancel).solution
+
+    def solve_anytime(self, cube, time_budget=None, max_evaluations=None, target_fitness=None,
+                      progress=None, cancel=None, checkpoint=None):
+        """Run the GA until it solves the cube or a budget runs out and return a SolveResult.
+
+        time_budget is in seconds of wall-clock time, max_evaluations counts scored individuals and
+        target_fitness stops the run once the best fitness reaches it. A generation is only started if the
+        previous one suggests it fits in what is left of the time and evaluation budgets.
+
+        checkpoint is a Checkpoint (see checkpoint_path) to start from. Taken on this same cube, the run resumes
+        where it was saved, counting its generations and evaluations; taken on another cube, its population
+        seeds the first generation instead of random sequences.
+
+        progress(generation, best_fitness, avg_fitness) is called once per generation and replaces every console
+        print, including the final outcome, which the caller reads from the SolveResult instead.
+        """
+        result = SolveResult()
+        metrics = self.metrics or NULL_METRICS
         best_fitness = -1
         initial_state = cube.get_state()
+        start_time = time.perf_counter()
+
+        if not validate_states(initial_state)[0]:
+            if progress is None:
+                print("Cube state is not reachable from solved")
+            result.finish([], False, 'invalid_state', time.perf_counter() - start_time)
+            metrics.finish(result, self)
+            return result
 
-        # Initialize population
-        population = [self.create_individual() for _ in range(self.population_size)]
+        if self.solution_cache is not None:
+            cached = self.solution_cache.lookup(initial_state)
+            if cached is not None:
+                if progress is None:
+                    print("Solution found in cache")
+                result.finish(cached, True, 'cache', time.perf_counter() - start_time)
+                metrics.finish(result, self)
+                return result
+
+        # Initialize population as a padded move-code matrix. The generator is seeded from the random
+        # module so random.seed still makes runs reproducible.
+        rng = np.random.default_rng(random.getrandbits(64))
+        first_generation = 0
+        control = AdaptiveControl(self) if self.adaptive else None
+        if checkpoint is not None and checkpoint.matches(initial_state):
+            # Resume: restore the saved run and breed the generation that follows the checkpoint
+            rng.bit_generator.state = checkpoint.rng_state
+            best_fitness = checkpoint.best_fitness
+            result.solution = decode_moves(checkpoint.best)
+            result.best_fitness = float(best_fitness)
+            result.evaluations = checkpoint.evaluations
+            result.generations = first_generation = checkpoint.generation + 1
+            if control is not None and checkpoint.adaptive_state is not None:
+                control.restore(checkpoint.adaptive_state)
+            codes, lengths = self._fit_width(checkpoint.codes)
+            codes, lengths = self._breed(codes, lengths, checkpoint.fitness, rng, control)
+        elif checkpoint is not None:
+            codes, lengths = self._warm_population(checkpoint, rng)
+        else:
+            codes, lengths = self.create_population(self.population_size, rng)
+        generation_time = 0.0  # Duration of the last generation, used to predict the next one
         
-        for generation in range(self.max_generations):
-            fitness_scores = []
-            
+        for generation in range(first_generation, self.max_generations):
+            if cancel is not None and cancel.is_set():
+                if progress is None:
+                    print("Solve cancelled")
+                result.stop_reason = 'cancelled'
+                break
+            elapsed = time.perf_counter() - start_time
+            if time_budget is not None and elapsed + generation_time > time_budget:
+                result.stop_reason = 'time_budget'
+                break
+            if max_evaluations is not None and result.evaluations + len(codes) > max_evaluations:
+                result.stop_reason = 'evaluation_budget'
+                break
+            generation_start = time.perf_counter()
+            metrics.start_generation(generation)
+            if metrics.enabled:
+                metrics.count('moves', int(lengths.sum()))
+
             # Evaluate fitness
-            for individual in population:
-                test_cube = RubiksCube()
-                test_cube.state = initial_state.copy()
-                
-                # Apply moves
-                for move in individual:
-                    test_cube.make_move(move)
-                
-                # Calculate fitness
-                fitness = self.evaluate_fitness(test_cube.state)
-                fitness_scores.append(fitness)
-                
-                # Check if solved
-                if test_cube.is_solved():
+            if self.best_prefix:
+                with metrics.phase('fitness'):  # Moves and scores are applied together, one column at a time
+                    fitness_scores, solved = self._evaluate_best_prefixes(initial_state, codes, lengths)
+            elif self.batch_evaluation:
+                fitness_scores, solved = self.evaluate_population(initial_state, codes)
+            else:
+                with metrics.phase('fitness'):
+                    fitness_scores, solved = self._evaluate_sequentially(initial_state, [decode_moves(row) for row in codes])
+            metrics.count('evaluations', len(codes))
+            result.evaluations += len(codes)
+            result.generations = generation + 1
+
+            # Check if solved
+            solved_indices = np.flatnonzero(solved)
+            if solved_indices.size:
+                if progress is None:
                     print(f"Solution found in generation {generation}")
-                    return self._optimize_solution(individual)
-                
-                # Update best solution
-                if fitness > best_fitness:
-                    best_fitness = fitness
-                    best_solution = individual.copy()
+                solution = self._optimize_solution(decode_moves(codes[solved_indices[0]]))
+                if self.solution_cache is not None:
+                    self.solution_cache.store(initial_state, solution)
+                result.best_fitness = float(fitness_scores[solved_indices[0]])
+                result.history.append((time.perf_counter() - start_time, result.evaluations, result.best_fitness))
+                result.finish(solution, True, 'solved', time.perf_counter() - start_time)
+                metrics.end_generation(generation, result.best_fitness, np.mean(fitness_scores), self)
+                metrics.finish(result, self)
+                return result
+
+            # Update best solution
+            best_index = int(np.argmax(fitness_scores))
+            if fitness_scores[best_index] > best_fitness:
+                best_fitness = fitness_scores[best_index]
+                result.solution = decode_moves(codes[best_index])
+                result.best_fitness = float(best_fitness)
+                result.history.append((time.perf_counter() - start_time, result.evaluations, result.best_fitness))
+                if progress is None:
                     print(f"Generation {generation}: New best fitness = {best_fitness}")
 
             # Log the average fitness of the current generation
             avg_fitness = np.mean(fitness_scores)
-            print(f"Generation {generation}: Average fitness = {avg_fitness}")
+            if progress is None:
+                print(f"Generation {generation}: Average fitness = {avg_fitness}")
+            else:
+                progress(generation, best_fitness, avg_fitness)
 
-            # Select parents using tournament selection
-            parents = []
-            while len(parents) < self.population_size:
-                tournament = random.sample(list(enumerate(fitness_scores)), 3)
-                winner = max(tournament, key=lambda x: x[1])[0]
-                parents.append(population[winner])
+            if target_fitness is not None and best_fitness >= target_fitness:
+                metrics.end_generation(generation, best_fitness, avg_fitness, self)
+                result.stop_reason = 'target_fitness'
+                break
 
-            # Create new generation
-            new_population = []
-            
-            # Add elite solutions
-            elite_indices = np.argsort(fitness_scores)[-self.elite_size:]
-            new_population.extend([population[i] for i in elite_indices])
+            if self.checkpoint_path and (generation + 1) % self.checkpoint_interval == 0:
+                Checkpoint(initial_state, generation, codes, fitness_scores, rng.bit_generator.state,
+                           encode_moves(result.solution), best_fitness, result.evaluations,
+                           control.state() if control is not None else None).save(self.checkpoint_path)
+
+            codes, lengths = self._breed(codes, lengths, fitness_scores, rng, control)
+            metrics.end_generation(generation, best_fitness, avg_fitness, self)
+            generation_time = time.perf_counter() - generation_start
+        else:
+            if progress is None:
+                print("No solution found")
+            result.stop_reason = 'max_generations'
+
+        result.finish(result.solution, False, result.stop_reason, time.perf_counter() - start_time)
+        metrics.finish(result, self)
+        return result
+
+    def solve_many(self, states, time_budget=None, max_evaluations=None, progress=None, cancel=None):
+        """Solve many scrambles together and return one SolveResult per state, in order.
+
+        states is an (N, 54) sticker array, or anything that reshapes to one, such as a list of 6x3x3 cube
+        states. Every scramble has its own population of population_size sequences, but each generation
+        replays, scores and breeds all of them as one matrix, so the per-generation overhead is shared and
+        throughput grows with the batch. A scramble leaves the working set as soon as one of its sequences
+        solves it. time_budget and max_evaluations cover the whole batch; progress(generation, solved,
+        remaining) replaces the per-generation prints, and metrics gets one record per generation of the
+        batch. best_prefix, adaptive and checkpoints only apply to solve_anytime.
+        """
+        metrics = self.metrics or NULL_METRICS
+        start_time = time.perf_counter()
+        raw = np.asarray(states).reshape(-1, 54)
+        valid = validate_states(raw) if raw.dtype.kind in 'iuf' else np.zeros(len(raw), dtype=bool)
+        states = np.where(valid[:, None], raw, 0).astype(np.int8)  # Checked first, so the cast never truncates or wraps
+        results = [SolveResult() for _ in range(len(states))]
+        active = []  # Indices of the scrambles still being solved, in the order of their population blocks
+        for index, result in enumerate(results):
+            cached = None
+            if valid[index] and self.solution_cache is not None:
+                cached = self.solution_cache.lookup(states[index])
+            if not valid[index]:
+                result.finish([], False, 'invalid_state', 0.0)
+            elif cached is not None:
+                result.finish(cached, True, 'cache', time.perf_counter() - start_time)
+            else:
+                active.append(index)
+        active = np.array(active, dtype=np.intp)
+
+        size = self.population_size
+        rng = np.random.default_rng(random.getrandbits(64))  # Seeded from the random module, as in solve_anytime
+        codes, lengths = self.create_population(size * len(active), rng)
+        best_fitness = np.full(len(states), -np.inf)
+        best_codes = np.full((len(states), codes.shape[1]), NO_MOVE, dtype=np.int8)
+        summary = SolveResult()  # The batch as a whole, for metrics
+        stop_reason = 'max_generations'
+        generation_time = 0.0
+
+        for generation in range(self.max_generations):
+            if not len(active):
+                stop_reason = 'solved'
+                break
+            if cancel is not None and cancel.is_set():
+                stop_reason = 'cancelled'
+                break
+            elapsed = time.perf_counter() - start_time
+            if time_budget is not None and elapsed + generation_time > time_budget:
+                stop_reason = 'time_budget'
+                break
+            if max_evaluations is not None and summary.evaluations + len(codes) > max_evaluations:
+                stop_reason = 'evaluation_budget'
+                break
+            generation_start = time.perf_counter()
+            metrics.start_generation(generation)
+            if metrics.enabled:
+                metrics.count('moves', int(lengths.sum()))
+
+            # Replay and score every population in one pass
+            with metrics.phase('moves'):
+                replayed = apply_move_codes(np.repeat(states[active], size, axis=0), codes)
+            with metrics.phase('fitness'):
+                solved = (replayed == SOLVED_STICKERS).all(axis=1).reshape(len(active), size)
+                if self.pattern_database is not None:
+                    fitness_scores = self.pattern_database.fitness(replayed)
+                else:
+                    fitness_scores = self.evaluate_fitness_batch(replayed)
+                fitness_scores = fitness_scores.reshape(len(active), size)
+            metrics.count('evaluations', len(codes))
+            summary.evaluations += len(codes)
+            summary.generations = generation + 1
+            now = time.perf_counter() - start_time
+
+            # Track each scramble's fittest sequence and finish the ones that were solved
+            blocks = np.arange(len(active))
+            best_rows = np.argmax(fitness_scores, axis=1)
+            improved = fitness_scores[blocks, best_rows] > best_fitness[active]
+            best_fitness[active[improved]] = fitness_scores[blocks, best_rows][improved]
+            best_codes[active[improved]] = codes[blocks[improved] * size + best_rows[improved]]
+            finished = solved.any(axis=1)
+            for block, index in enumerate(active.tolist()):
+                result = results[index]
+                result.evaluations += size
+                result.generations = generation + 1
+                if finished[block]:
+                    row = block * size + int(np.argmax(solved[block]))
+                    solution = self._optimize_solution(decode_moves(codes[row]))
+                    if self.solution_cache is not None:
+                        self.solution_cache.store(states[index], solution)
+                    result.best_fitness = float(fitness_scores.flat[row])
+                    result.history.append((now, result.evaluations, result.best_fitness))
+                    result.finish(solution, True, 'solved', now)
+                elif improved[block]:
+                    result.best_fitness = float(best_fitness[index])
+                    result.history.append((now, result.evaluations, result.best_fitness))
+            if finished.any():
+                metrics.count('solved', int(finished.sum()))
+                keep = ~finished
+                codes, lengths = codes[np.repeat(keep, size)], lengths[np.repeat(keep, size)]
+                fitness_scores, active = fitness_scores[keep], active[keep]
+
+            solved_count = sum(result.solved for result in results)
+            if progress is None:
+                print(f"Generation {generation}: {solved_count} solved, {len(active)} remaining")
+            else:
+                progress(generation, solved_count, len(active))
+
+            if len(active):
+                codes, lengths = self._next_generation_blocks(codes, lengths, fitness_scores, rng)
+            metrics.end_generation(generation, best_fitness.max(initial=0.0),
+                                   np.mean(fitness_scores) if len(active) else 0.0, self)
+            generation_time = time.perf_counter() - generation_start
+        else:
+            if not len(active):
+                stop_reason = 'solved'
+
+        elapsed = time.perf_counter() - start_time
+        for index in active.tolist():
+            results[index].finish(decode_moves(best_codes[index]), False, stop_reason, elapsed)
+        summary.finish([], all(result.solved for result in results), stop_reason, elapsed)
+        metrics.finish(summary, self)
+        return results
+
+    def select_parents(self, fitness_scores, count, rng, tournament_size=None):
+        """Tournament selection: indices of count parents, each the winner of tournament_size random contestants
+        (the attribute unless given).
+
+        With selection_pressure p < 1 the i-th fittest contestant wins with probability p * (1 - p) ** i, the
+        last one taking whatever is left, so weaker individuals sometimes breed and diversity lasts longer.
+        """
+        tournament_size = tournament_size or self.tournament_size
+        contestants = rng.integers(0, len(fitness_scores), (count, tournament_size))
+        return self._tournament_winners(contestants, fitness_scores[contestants], rng)
+
+    def _tournament_winners(self, contestants, scores, rng):
+        # Winner of each row of a (count, tournament_size) contestant matrix under selection_pressure
+        count, tournament_size = contestants.shape
+        rows = np.arange(count)
+        if self.selection_pressure >= 1:
+            return contestants[rows, np.argmax(scores, axis=1)]
+        ranks = np.minimum(rng.geometric(self.selection_pressure, count) - 1, tournament_size - 1)
+        order = np.argsort(-scores, axis=1, kind='stable')
+        return contestants[rows, order[rows, ranks]]
+
+    def select_elites(self, fitness_scores):
+        """Indices of the elite_size fittest individuals, in no particular order"""
+        count = min(self.elite_size, len(fitness_scores))
+        if count <= 0:
+            return np.zeros(0, dtype=np.intp)
+        return np.argpartition(fitness_scores, len(fitness_scores) - count)[-count:]
+
+    def _next_generation(self, codes, lengths, fitness_scores, rng, control=None):
+        """Breed the next population matrix from the current one and its fitness scores, with the parameters
+        of an AdaptiveControl when one is given"""
+        metrics = self.metrics or NULL_METRICS
+        size = self.population_size if control is None else control.population_size
+        tournament_size = None if control is None else control.tournament_size
+        mutation_rate = None if control is None else control.mutation_rate
+        with metrics.phase('selection'):
+            parents = self.select_parents(fitness_scores, size, rng, tournament_size)
+            elite_indices = self.select_elites(fitness_scores)
+
+            # Create rest of population through crossover and mutation, pairing two different parent slots
+            pairs = (size - len(elite_indices) + 1) // 2
+            slot1 = rng.integers(0, size, pairs)
+            slot2 = (slot1 + rng.integers(1, size, pairs)) % size
+            first, second = parents[slot1], parents[slot2]
+        with metrics.phase('crossover'):
+            children, child_lengths = self.crossover_population(codes[first], lengths[first], codes[second], lengths[second], rng)
+        with metrics.phase('mutation'):
+            children, child_lengths = self.mutate_population(children, child_lengths, rng, mutation_rate)
+
+        new_codes = np.concatenate([codes[elite_indices], children])[:size]
+        new_lengths = np.concatenate([lengths[elite_indices], child_lengths])[:size]
+        return new_codes, new_lengths
+
+    def _breed(self, codes, lengths, fitness_scores, rng, control):
+        """The population that follows a scored one: _next_generation, plus the adaptive control's parameter
+        update, diversification and restarts when there is one"""
+        metrics = self.metrics or NULL_METRICS
+        restart = control is not None and control.observe(codes, fitness_scores)
+        codes, lengths = self._next_generation(codes, lengths, fitness_scores, rng, control)
+        if control is not None:
+            with metrics.phase('mutation'):
+                codes, lengths = control.diversify(codes, lengths, rng)
+        if restart:
+            with metrics.phase('mutation'):
+                codes, lengths = control.restart(codes, lengths, rng)
+            metrics.count('restarts')
+        return codes, lengths
+
+    def _next_generation_blocks(self, codes, lengths, fitness_scores, rng):
+        """_next_generation for several populations bred side by side. fitness_scores is (populations, size)
+        and the rows of codes follow it block by block; parents, elites and mates all come from a row's own
+        block, while crossover and mutation run over all blocks at once."""
+        metrics = self.metrics or NULL_METRICS
+        blocks, size = fitness_scores.shape
+        offsets = (np.arange(blocks) * size)[:, None]
+        with metrics.phase('selection'):
+            contestants = rng.integers(0, size, (blocks * size, self.tournament_size)) + np.repeat(offsets, size, axis=0)
+            parents = self._tournament_winners(contestants, fitness_scores.ravel()[contestants], rng).reshape(blocks, size)
+            elites = max(min(self.elite_size, size), 0)
+            elite_indices = np.zeros(0, dtype=np.intp)
+            if elites:
+                elite_indices = (np.argpartition(fitness_scores, size - elites, axis=1)[:, size - elites:] + offsets).ravel()
+
+            # Pair two different parent slots of the same block for each pair of children
+            pairs = (size - elites + 1) // 2
+            slot1 = rng.integers(0, size, (blocks, pairs))
+            slot2 = (slot1 + rng.integers(1, size, (blocks, pairs))) % size
+            first = np.take_along_axis(parents, slot1, axis=1).ravel()
+            second = np.take_along_axis(parents, slot2, axis=1).ravel()
+        with metrics.phase('crossover'):
+            children, child_lengths = self.crossover_population(codes[first], lengths[first], codes[second], lengths[second], rng)
+        with metrics.phase('mutation'):
+            children, child_lengths = self.mutate_population(children, child_lengths, rng)
+
+        width = codes.shape[1]
+        new_codes = np.concatenate([codes[elite_indices].reshape(blocks, elites, width),
+                                    children.reshape(blocks, 2 * pairs, width)], axis=1)[:, :size]
+        new_lengths = np.concatenate([lengths[elite_indices].reshape(blocks, elites),
+                                      child_lengths.reshape(blocks, 2 * pairs)], axis=1)[:, :size]
+        return new_codes.reshape(-1, width), new_lengths.reshape(-1)
+
+    def _fit_width(self, codes):
+        """Copy of a move-code matrix cut or padded to max_sequence_length columns, and its row lengths"""
+        width = self.max_sequence_length
+        fitted = np.full((len(codes), width), NO_MOVE, dtype=np.int8)
+        fitted[:, :min(width, codes.shape[1])] = codes[:, :width]
+        return fitted, (fitted != NO_MOVE).sum(axis=1)
+
+    def _warm_population(self, checkpoint, rng):
+        """First population taken from another run: its fittest rows, topped up with random ones if it is smaller"""
+        order = np.argsort(-checkpoint.fitness, kind='stable')[:self.population_size]
+        codes, lengths = self._fit_width(checkpoint.codes[order])
+        missing = self.population_size - len(codes)
+        if missing > 0:
+            extra, extra_lengths = self.create_population(missing, rng)
+            codes, lengths = np.concatenate([codes, extra]), np.concatenate([lengths, extra_lengths])
+        return codes, lengths
+
+    def _evaluate_sequentially(self, initial_state, population):
+        """Replay and score individuals one cube at a time, the reference for evaluate_population"""
+        fitness_scores = np.empty(len(population))
+        solved = np.zeros(len(population), dtype=bool)
+        for i, individual in enumerate(population):
+            test_cube = RubiksCube()
+            test_cube.state = initial_state.copy()
             
-            # Create rest of population through crossover and mutation
-            while len(new_population) < self.population_size:
-                parent1, parent2 = random.sample(parents, 2)
-                child1, child2 = self.crossover(parent1, parent2)
-                new_population.extend([self.mutate(child1), self.mutate(child2)])
+            # Apply moves
+            for move in individual:
+                test_cube.make_move(move)
             
-            population = new_population[:self.population_size]
-
-        print("No solution found")
-        return best_solution or []
+            # Calculate fitness
+            if self.pattern_database is not None:
+                fitness_scores[i] = self.pattern_database.fitness(test_cube.state)[0]
+            else:
+                fitness_scores[i] = self.evaluate_fitness(test_cube.state)
+            solved[i] = test_cube.is_solved()
+        return fitness_scores, solved
 
     def _optimize_solution(self, solution):
         """Remove redundant moves from solution"""
-        optimized = []
-        i = 0
-        while i < len(solution):
-            if i + 1 < len(solution) and solution[i][0] == solution[i+1][0]:
-                i += 2  # Skip canceling moves
+        return simplify_moves(solution)
+
+
+def _build_search_successors():
+    # Moves a breadth-first search can skip: undoing the last move, or a third equal quarter turn in a row, spells
+    # a state already reached by a shorter path. The ordering rules of CANONICAL_SUCCESSORS are left out since
+    # the search keeps only one path per state, and that path's order could forbid moves another path allows.
+    allowed = np.ones_like(CANONICAL_SUCCESSORS)
+    for last in range(len(MOVES)):
+        allowed[2 * last:2 * last + 2, last ^ 1] = False  # Inverse moves differ in the lowest bit of their code
+        allowed[2 * last + 1, last] = False
+    return allowed
+
+
+SEARCH_SUCCESSORS = _build_search_successors()
+
+
+class _SearchTree:
+    # One side of a bidirectional search: every state reached, by key, with its parent node and the move into it
+    def __init__(self, state):
+        self.seen = KeySet()
+        self.seen.insert(state_keys(state.reshape(1, 54)), np.zeros(1, dtype=np.int32))
+        self.parents = [np.full(1, -1, dtype=np.int32)]  # One array per depth; node ids count across depths
+        self.moves = [np.full(1, NO_MOVE, dtype=np.int8)]
+        self.frontier = state.reshape(1, 54).astype(np.int8)
+        self.frontier_ids = np.zeros(1, dtype=np.int32)
+        self.frontier_canonical = np.full(1, CANONICAL_START)  # Canonical-generator state of each frontier path
+        self.depth = 0
+        self.count = 1
+        self.branching = len(MOVES) - 1  # New states per frontier state at the last expansion
+
+    @property
+    def nbytes(self):
+        return (self.seen.nbytes + 5 * self.count + self.frontier.nbytes
+                + self.frontier_ids.nbytes + self.frontier_canonical.nbytes)
+
+    def expansion_bytes(self, chunk=EXPAND_CHUNK):
+        # Estimated peak memory the next level adds: its states twice over while they are joined into one array,
+        # their ids, parents and moves, a new key table next to the old one while it is rebuilt, and one chunk
+        new = int(len(self.frontier) * self.branching) + 1
+        capacity = KeySet.capacity_for(self.seen.size + new)
+        table = 12 * capacity if capacity > len(self.seen.keys) else 0
+        return new * (2 * 54 + 2 * 4 + 2 * 8 + 5) + table + min(len(self.frontier), chunk) * len(MOVES) * 100
+
+    def expand(self, chunk=EXPAND_CHUNK):
+        """Add the next depth and return (keys, node ids) of its states and how many children were generated"""
+        states, ids, moves, keys, canonical = [], [], [], [], []
+        generated = 0
+        for start in range(0, len(self.frontier), chunk):
+            block = self.frontier[start:start + chunk]
+            children = block[:, MOVE_PERMUTATIONS].reshape(-1, 54)  # Row 12 * i + m is move m from state i
+            parents = np.repeat(self.frontier_ids[start:start + chunk], len(MOVES))
+            child_moves = np.tile(np.arange(len(MOVES), dtype=np.int8), len(block))
+            # Skip moves that only respell a state reached earlier
+            parent_canonical = np.repeat(self.frontier_canonical[start:start + chunk], len(MOVES))
+            keep = SEARCH_SUCCESSORS[parent_canonical, child_moves]
+            generated += int(keep.sum())
+            child_keys = state_keys(children[keep])
+            child_keys, first = np.unique(child_keys, return_index=True)
+            new = self.seen.lookup(child_keys) < 0
+            rows = np.flatnonzero(keep)[first[new]]
+            node_ids = np.arange(self.count, self.count + len(rows), dtype=np.int32)
+            self.seen.insert(child_keys[new], node_ids)
+            self.count += len(rows)
+            states.append(children[rows])
+            ids.append(node_ids)
+            moves.append(child_moves[rows])
+            canonical.append(canonical_next(parent_canonical[rows], child_moves[rows]))
+            keys.append(child_keys[new])
+            self.parents.append(parents[rows])
+        previous = len(self.frontier)
+        self.frontier = None  # Release the old depth before joining the new one
+        self.frontier = np.concatenate(states)
+        self.frontier_ids = np.concatenate(ids)
+        self.frontier_canonical = np.concatenate(canonical)
+        self.moves.append(np.concatenate(moves))
+        self.parents[-len(states):] = [np.concatenate(self.parents[-len(states):])]
+        self.depth += 1
+        self.branching = len(self.frontier) / previous if previous else 0
+        return np.concatenate(keys), self.frontier_ids, generated
+
+    def path_to(self, node):
+        """Move codes leading from the root to a node"""
+        parents = np.concatenate(self.parents)
+        moves = np.concatenate(self.moves)
+        path = []
+        while parents[node] >= 0:
+            path.append(int(moves[node]))
+            node = parents[node]
+        return path[::-1]
+
+
+class BidirectionalSolver:
+    """Breadth-first search from the scramble and from the solved state at once, joined where the two meet.
+
+    Both sides keep every state they reach as a 64-bit hashed key in a KeySet, so a state costs about 30 bytes
+    rather than a Python object. The side with the smaller frontier grows one full depth at a time, and the
+    first depth at which the sides meet gives a shortest solution in quarter turns. The tree grown from the
+    solved state is kept and reused by later solves. When the next depth would take either side past
+    memory_limit the search stops and returns an empty, unsolved result instead of exhausting memory, so
+    deep scrambles should fall back to the GA or the two-phase solver.
+    """
+
+    def __init__(self, memory_limit=1 << 30, max_depth=26):
+        self.memory_limit = memory_limit  # Bytes both search trees together may use
+        self.max_depth = max_depth  # Longest solution, in quarter turns, to search for
+        self._solved_tree = None
+
+    def solve(self, cube):
+        """Return a shortest solving sequence of (face, direction) moves, or [] if the limits are reached first"""
+        return self.search(cube).solution
+
+    def search(self, cube):
+        """Search for a shortest solution and return a SolveResult; evaluations counts generated states"""
+        result = SolveResult()
+        start_time = time.perf_counter()
+        state = cube.get_state().reshape(54)
+        if not validate_states(state)[0]:
+            result.finish([], False, 'invalid_state', time.perf_counter() - start_time)
+            return result
+        if self._solved_tree is None:
+            self._solved_tree = _SearchTree(SOLVED_STICKERS)
+        forward, backward = _SearchTree(state), self._solved_tree
+
+        # The scramble may already be in the kept solved-side tree
+        joined = self._join(state, forward, backward, state_keys(state.reshape(1, 54)), np.zeros(1, dtype=np.int32))
+        while joined is None:
+            if forward.depth + backward.depth >= self.max_depth:
+                result.stop_reason = 'max_depth'
+                break
+            used = forward.nbytes + backward.nbytes
+            sides = sorted([forward, backward], key=lambda tree: len(tree.frontier))
+            side = next((tree for tree in sides if used + tree.expansion_bytes() <= self.memory_limit), None)
+            if side is None or not len(side.frontier):
+                result.stop_reason = 'memory_limit' if side is None else 'unreachable'
+                break
+            keys, ids, generated = side.expand()
+            result.evaluations += generated
+            result.generations += 1
+            if side is forward:
+                joined = self._join(state, forward, backward, keys, ids)
             else:
-                optimized.append(solution[i])
-                i += 1
-        return optimized
\ No newline at end of file
+                joined = self._join(state, forward, backward, keys, ids, from_solved=True)
+
+        if joined is not None:
+            # The two halves are each canonical, but where they meet moves can still cancel or combine
+            solution = simplify_moves(decode_moves(joined))
+            result.best_fitness = float(len(solution))
+            result.finish(solution, True, 'solved', time.perf_counter() - start_time)
+        else:
+            result.finish([], False, result.stop_reason, time.perf_counter() - start_time)
+        return result
+
+    @staticmethod
+    def _join(state, forward, backward, keys, ids, from_solved=False):
+        # Move codes solving the state through the first of the new states that the other side also reached
+        other = forward if from_solved else backward
+        matches = other.seen.lookup(keys)
+        for row in np.flatnonzero(matches >= 0):
+            forward_node, backward_node = (matches[row], ids[row]) if from_solved else (ids[row], matches[row])
+            undo = [code ^ 1 for code in reversed(backward.path_to(backward_node))]
+            codes = np.array(forward.path_to(forward_node) + undo, dtype=np.int8)
+            # Distinct states can share a hashed key, so check the joined path before trusting it
+            if np.array_equal(apply_move_codes(state.reshape(1, 54), codes[None])[0], SOLVED_STICKERS):
+                return codes
+        return None
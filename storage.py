@@ -0,0 +1,16 @@
+import contextlib
+import os
+
+
+@contextlib.contextmanager
+def atomic_write(path):
+    """Open path for binary writing through a temporary file that replaces it only once complete, so neither
+    a crash nor a concurrent reader ever sees a half-written file"""
+    temporary = f'{path}.{os.getpid()}.tmp'
+    try:
+        with open(temporary, 'wb') as handle:
+            yield handle
+        os.replace(temporary, path)
+    finally:
+        if os.path.exists(temporary):
+            os.remove(temporary)
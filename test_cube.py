@@ -0,0 +1,77 @@
+"""Parity of the permutation-table moves with the reference slice-based RubiksCube._slice_move."""
+import random
+import numpy as np
+import pytest
+from cube import MOVES, SOLVED_STICKERS, RubiksCube, apply_move_codes, check_state, compose_moves, encode_population
+
+
+def _random_sequences(count=50, length=30, seed=1234):
+    rng = random.Random(seed)
+    return [[rng.choice(MOVES) for _ in range(rng.randint(0, length))] for _ in range(count)]
+
+
+def _slice_cube(moves):
+    cube = RubiksCube()
+    for move in moves:
+        cube._slice_move(move)
+    return cube
+
+
+def test_each_move_matches_slice_move():
+    for move in MOVES:
+        cube = RubiksCube()
+        cube.make_move(move)
+        assert np.array_equal(cube.state, _slice_cube([move]).state)
+
+
+def test_make_move_matches_slice_move():
+    for moves in _random_sequences():
+        cube = RubiksCube()
+        reference = RubiksCube()
+        for move in moves:
+            cube.make_move(move)
+            reference._slice_move(move)
+            assert np.array_equal(cube.state, reference.state)
+
+
+def test_apply_moves_and_compose_moves_match_slice_move():
+    for moves in _random_sequences():
+        expected = _slice_cube(moves).state
+        cube = RubiksCube()
+        cube.apply_moves(moves)
+        assert np.array_equal(cube.state, expected)
+        composed = RubiksCube()
+        composed.apply_permutation(compose_moves(moves))
+        assert np.array_equal(composed.state, expected)
+
+
+def test_apply_move_codes_matches_slice_move():
+    sequences = _random_sequences(count=300)  # Enough rows for the grouped gather path too
+    codes = encode_population(sequences)
+    solved = np.broadcast_to(SOLVED_STICKERS, (len(sequences), 54))
+    for rows in (slice(0, 10), slice(None)):
+        states = apply_move_codes(solved[rows], codes[rows])
+        for moves, state in zip(sequences[rows], states):
+            assert np.array_equal(state, _slice_cube(moves).state.reshape(54))
+
+
+def test_is_solved_agrees_with_slice_move():
+    for moves in _random_sequences(seed=99):
+        cube = RubiksCube()
+        cube.apply_moves(moves + [(face, -direction) for face, direction in reversed(moves)])
+        assert cube.is_solved()
+        if moves:
+            cube.apply_moves(moves)
+            assert cube.is_solved() == bool(np.array_equal(_slice_cube(moves).state.reshape(54), SOLVED_STICKERS))
+    assert not _slice_cube([(0, 1)]).is_solved()
+
+
+def test_check_state_validates_raw_values():
+    scrambled = _slice_cube(_random_sequences(count=1, seed=5)[0]).state
+    check_state(scrambled)
+    check_state(scrambled.reshape(54).astype(float))
+    fractional = SOLVED_STICKERS.astype(float)
+    fractional[0] = 0.5
+    for state in ([300] * 54, fractional, ['0'] * 54, SOLVED_STICKERS[:53], np.tile(SOLVED_STICKERS, 2)):
+        with pytest.raises(ValueError):
+            check_state(state)
@@ -0,0 +1,72 @@
+"""PrefixCache.replay against plain apply_move_codes replay of the same populations."""
+import random
+import numpy as np
+from cube import NO_MOVE, RubiksCube, apply_move_codes
+from prefix_cache import PrefixCache
+from solver import CubeSolver
+
+
+def _scrambled_state(seed=7):
+    rng = random.Random(seed)
+    cube = RubiksCube()
+    cube.apply_moves([(rng.randrange(6), rng.choice((-1, 1))) for _ in range(20)])
+    return cube.get_state()
+
+
+def _replay(state, codes):
+    return apply_move_codes(np.tile(state.reshape(1, 54), (len(codes), 1)), codes)
+
+
+def _generations(state, count=12, seed=3):
+    # Populations of a short GA run, so rows share prefixes the way offspring do
+    solver = CubeSolver()
+    solver.population_size = 300
+    rng = np.random.default_rng(seed)
+    codes, lengths = solver.create_population(solver.population_size, rng)
+    for _ in range(count):
+        yield codes.copy()
+        fitness_scores, _ = solver.evaluate_population(state, codes)
+        codes, lengths = solver._next_generation(codes, lengths, fitness_scores, rng)
+
+
+def test_replay_matches_apply_move_codes():
+    state = _scrambled_state()
+    for stride in (1, 2, 4):
+        for max_states in (100000, 500):  # The small cache evicts every generation
+            cache = PrefixCache(max_states=max_states, stride=stride)
+            for codes in _generations(state):
+                assert np.array_equal(cache.replay(state, codes), _replay(state, codes))
+            stats = cache.stats()
+            assert stats['states'] <= max_states
+            assert stats['hits'] + stats['partial_hits'] > 0
+            assert (stats['evictions'] > 0) == (max_states == 500)
+
+
+def test_replay_counts_hits_and_rebinds_on_a_new_scramble():
+    state = _scrambled_state()
+    codes = next(_generations(state))
+    cache = PrefixCache()
+    cache.replay(state, codes)
+    assert cache.misses == len(codes) and cache.moves_saved == 0
+    assert np.array_equal(cache.replay(state, codes), _replay(state, codes))
+    assert cache.hits == len(codes)
+    assert cache.moves_saved == int((codes != NO_MOVE).sum())
+
+    other = _scrambled_state(seed=8)
+    assert np.array_equal(cache.replay(other, codes), _replay(other, codes))
+    assert cache.hits == 0 and cache.misses == len(codes)
+
+
+def test_solve_anytime_is_unchanged_by_the_cache():
+    cube = RubiksCube()
+    cube.state = _scrambled_state().reshape(6, 3, 3)
+    results = []
+    for prefix_cache in (None, PrefixCache()):
+        random.seed(11)
+        solver = CubeSolver()
+        solver.population_size = 300
+        solver.max_generations = 15
+        solver.prefix_cache = prefix_cache
+        result = solver.solve_anytime(cube, progress=lambda *args: None)
+        results.append((result.solution, result.best_fitness, result.evaluations))
+    assert results[0] == results[1]
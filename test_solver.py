@@ -0,0 +1,36 @@
+"""CubeSolver.solve_many on malformed states and on populations bred without elites."""
+import random
+import numpy as np
+from cube import SOLVED_STICKERS, RubiksCube
+from solver import CubeSolver
+
+
+def _solver():
+    random.seed(5)
+    solver = CubeSolver()
+    solver.population_size = 60
+    solver.max_generations = 5
+    return solver
+
+
+def _scrambled_state():
+    cube = RubiksCube()
+    cube.apply_moves([(0, 1), (2, -1)])
+    return cube.get_state().reshape(54)
+
+
+def test_solve_many_reports_unreachable_raw_values_as_invalid():
+    fractional = SOLVED_STICKERS.astype(float)
+    fractional[0] = 0.5  # Would pass as color 0 after an int8 cast
+    wrapping = SOLVED_STICKERS.astype(np.int64)
+    wrapping[0] = 256  # Would wrap to color 0
+    results = _solver().solve_many([fractional, wrapping, _scrambled_state()], progress=lambda *args: None)
+    assert [result.stop_reason for result in results[:2]] == ['invalid_state', 'invalid_state']
+    assert results[2].stop_reason != 'invalid_state'
+
+
+def test_solve_many_breeds_without_elites():
+    solver = _solver()
+    solver.elite_size = 0
+    results = solver.solve_many([_scrambled_state()] * 3, progress=lambda *args: None)
+    assert all(result.generations > 0 for result in results)
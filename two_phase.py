@@ -0,0 +1,488 @@
+import os
+import time
+import numpy as np
+from cube import MOVE_INDEX, MOVE_PERMUTATIONS, OPPOSITE_FACE, SOLVED_STICKERS, check_state
+from coordinates import (CORNER_SLOTS, EDGE_SLOTS, UNREACHED, bfs_distances, build_move_table, multiset_size,
+                         rank_multiset)
+from storage import atomic_write
+
+# Face-turn metric moves: index 3*face + k is a clockwise (k=0), half (k=1) or counter-clockwise (k=2) turn
+FACE_TURNS = [(face, amount) for face in range(6) for amount in (1, 2, 3)]
+NO_LAST_TURN = len(FACE_TURNS)
+
+# Phase 1 takes the cube into <Top, Bottom, Front2, Back2, Right2, Left2> in two steps, passing through
+# <Top, Bottom, Front, Back, Right2, Left2> (phase 1a) whose moves never mix two separate sets of edge slots
+PHASE1B_TURNS = [0, 1, 2, 3, 4, 5, 7, 10, 12, 13, 14, 15, 16, 17]
+PHASE2_TURNS = [12, 13, 14, 15, 16, 17, 1, 4, 7, 10]
+PHASE1B_INDEX = np.full(NO_LAST_TURN, -1, dtype=np.intp)
+PHASE1B_INDEX[PHASE1B_TURNS] = np.arange(len(PHASE1B_TURNS))
+
+# Subset coordinates: which of the 24 corner or 24 edge slots hold a color class, or a single color
+COLOR_CLASSES = np.array([0, 0, 1, 1, 2, 2], dtype=np.int8)  # Front/Back, Right/Left, Top/Bottom colors
+SUBSET_COUNTS = (16, 8)  # 8 of the 24 slots in an orbit hold a given class
+COLOR_COUNTS = (20, 4)  # 4 of the 24 slots in an orbit hold a given color
+
+# Phase 1b edge coordinates: the colors on each of the two edge orbits of the phase 1b moves
+PHASE1B_EDGE_ORBITS = [
+    ([1, 3, 5, 7, 10, 12, 14, 16, 19, 25, 28, 34], 0, (4, 4, 2, 2)),  # Slots, lowest color, color counts
+    ([21, 23, 30, 32, 37, 39, 41, 43, 46, 48, 50, 52], 2, (2, 2, 4, 4)),
+]
+PHASE1B_EDGE_SIZE = multiset_size((4, 4, 2, 2))
+
+# Phase 2 coordinates. Under the phase 2 moves the side-face corner stickers travel in rigid pairs
+# ("dominoes"), as do the middle-layer edge stickers; Top/Bottom stickers move on their own.
+CORNER_DOMINOES = [(0, 29), (8, 24), (9, 20), (17, 33), (18, 2), (26, 15), (27, 11), (35, 6)]
+MIDDLE_EDGE_DOMINOES = [(3, 32), (5, 21), (12, 23), (14, 30)]
+UD_CORNER_SLOTS = [36, 38, 42, 44, 45, 47, 51, 53]
+UD_EDGE_SLOTS = [37, 39, 41, 43, 46, 48, 50, 52]
+SIDE_EDGE_SLOTS = [1, 7, 10, 16, 19, 25, 28, 34]
+PHASE2_SIZES = {
+    'corner_domino': multiset_size((1,) * 8),
+    'ud_corner': multiset_size((4, 4)),
+    'side_edge': multiset_size((2, 2, 2, 2)),
+    'ud_edge': multiset_size((4, 4)),
+    'middle_edge': multiset_size((1,) * 4),
+}
+
+TABLE_VERSION = 1
+SEARCH_CHUNK = 20000  # Nodes expanded per vectorized step; bounds the memory of one search level
+
+
+def _turn_permutations():
+    # 54-entry gather index of every face turn, built from the quarter-turn tables
+    permutations = []
+    for face, amount in FACE_TURNS:
+        if amount == 3:
+            permutations.append(MOVE_PERMUTATIONS[MOVE_INDEX[(face, -1)]])
+        else:
+            quarter = MOVE_PERMUTATIONS[MOVE_INDEX[(face, 1)]]
+            permutations.append(quarter if amount == 1 else quarter[quarter])
+    return np.array(permutations)
+
+
+def _allowed_successors():
+    # allowed[last, turn]: skip a second turn of the same face and order commuting opposite faces
+    allowed = np.ones((NO_LAST_TURN + 1, len(FACE_TURNS)), dtype=bool)
+    for last, (last_face, _) in enumerate(FACE_TURNS):
+        for turn, (face, _) in enumerate(FACE_TURNS):
+            if face == last_face or (face == OPPOSITE_FACE[last_face] and face < last_face):
+                allowed[last, turn] = False
+    return allowed
+
+
+TURN_PERMUTATIONS = _turn_permutations()
+ALLOWED_SUCCESSORS = _allowed_successors()
+
+
+def turns_to_moves(turns):
+    """Expand face turns into the (face, direction) quarter turns used by RubiksCube.make_move"""
+    moves = []
+    for turn in turns:
+        face, amount = FACE_TURNS[turn]
+        if amount == 3:
+            moves.append((face, -1))
+        else:
+            moves.extend([(face, 1)] * amount)
+    return moves
+
+
+def _domino_ids(dominoes, stickers):
+    # Map each domino slot's (first, second) colors to the index of the solved domino carrying them, -1 if none
+    lookup = np.full((6, 6), -1, dtype=np.int8)
+    for index, (first, second) in enumerate(dominoes):
+        lookup[SOLVED_STICKERS[first], SOLVED_STICKERS[second]] = index
+    firsts = [first for first, _ in dominoes]
+    seconds = [second for _, second in dominoes]
+    return lookup[stickers[:, firsts], stickers[:, seconds]]
+
+
+class TwoPhaseSolver:
+    """Two-phase IDA* solver over coordinate tables, as an alternative to CubeSolver.
+
+    The first solution can take seconds (a minute or more for deep scrambles) and is often 30+ face turns
+    even for short scrambles. With the default max_length and improve_time the search keeps looking for a
+    shorter one until improve_time is up; set max_length to None to return the first solution found.
+    time_limit bounds the whole search: past it the best solution so far is returned, or none at all.
+    For short scrambles BidirectionalSolver is much faster and finds shorter solutions.
+    """
+
+    def __init__(self, table_dir=None):
+        self.table_dir = table_dir or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tables')
+        self.max_length = 20  # Keep searching for a solution at most this many face turns long (None: first found)
+        self.time_limit = 60.0  # Seconds from the start after which the search stops, solved or not (None: never)
+        self.improve_time = 1.0  # Seconds from the start after which a solution longer than max_length is returned
+        self.max_phase1b_depth = 20  # Deepest phase 1b search tried for any phase 1a solution
+        self.max_phase2_depth = 24  # Deepest phase 2 search tried for any phase 1 solution
+        self.tables = None
+
+    # ------------------------------------------------------------------ tables
+
+    def _path(self, name):
+        return os.path.join(self.table_dir, f'two_phase_v{TABLE_VERSION}_{name}.npy')
+
+    def load_tables(self):
+        """Memory-map the tables, generating and saving them first if they are missing"""
+        names = ['corner_subset_moves', 'edge_subset_moves', 'edge_color_moves', 'phase1b_edge_moves',
+                 'phase1a_subset_prune', 'phase1a_color_prune', 'phase1b_corner_prune', 'phase1b_edge_prune',
+                 'phase2_corner_prune', 'phase2_edge_prune'] + [f'{name}_moves' for name in PHASE2_SIZES]
+        if not all(os.path.exists(self._path(name)) for name in names):
+            self.generate_tables()
+        # Read-only memory maps let every worker process share the same page cache copy; the plain
+        # ndarray views over them avoid np.memmap's per-index overhead in the search loops
+        self.tables = {name: np.asarray(np.load(self._path(name), mmap_mode='r')) for name in names}
+        return self.tables
+
+    def generate_tables(self):
+        """Build every move and pruning table and save them as .npy files in table_dir"""
+        os.makedirs(self.table_dir, exist_ok=True)
+        quarter_turns = list(MOVE_PERMUTATIONS)
+        phase2_permutations = TURN_PERMUTATIONS[PHASE2_TURNS]
+        self._check_dominoes(phase2_permutations)
+        tables = {
+            'corner_subset_moves': build_move_table(quarter_turns, CORNER_SLOTS, SUBSET_COUNTS),
+            'edge_subset_moves': build_move_table(quarter_turns, EDGE_SLOTS, SUBSET_COUNTS),
+            'edge_color_moves': build_move_table(quarter_turns, EDGE_SLOTS, COLOR_COUNTS),
+            'phase1b_edge_moves': np.stack([build_move_table(TURN_PERMUTATIONS[PHASE1B_TURNS], slots, counts)
+                                            for slots, _, counts in PHASE1B_EDGE_ORBITS]),
+        }
+
+        # Phase 1a: the Front/Back and Top/Bottom edge classes and the Right and Left edge colors.
+        # Each goal is every value the phase 1b moves reach from solved.
+        phase1a_solved = self._phase1a_coordinates(SOLVED_STICKERS[None, :])[0]
+        tables['phase1a_subset_prune'] = np.stack([
+            self._prune(lambda coords, turn: self._subset_turn(tables['edge_subset_moves'], coords, turn),
+                        PHASE1B_TURNS, range(len(FACE_TURNS)), phase1a_solved[column], multiset_size(SUBSET_COUNTS))
+            for column in (0, 1)])
+        tables['phase1a_color_prune'] = np.stack([
+            self._prune(lambda coords, turn: self._subset_turn(tables['edge_color_moves'], coords, turn),
+                        PHASE1B_TURNS, range(len(FACE_TURNS)), phase1a_solved[column], multiset_size(COLOR_COUNTS))
+            for column in (2, 3)])
+
+        # Phase 1b: the three corner classes and the colors on each edge orbit, goals closed under phase 2
+        phase1b_solved = self._phase1b_coordinates(SOLVED_STICKERS[None, :])[0]
+        tables['phase1b_corner_prune'] = np.stack([
+            self._prune(lambda coords, turn: self._subset_turn(tables['corner_subset_moves'], coords, turn),
+                        PHASE2_TURNS, PHASE1B_TURNS, phase1b_solved[column], multiset_size(SUBSET_COUNTS))
+            for column in range(3)])
+        tables['phase1b_edge_prune'] = np.stack([
+            self._prune(lambda coords, turn: tables['phase1b_edge_moves'][orbit][PHASE1B_INDEX[turn]][coords],
+                        PHASE2_TURNS, PHASE1B_TURNS, phase1b_solved[3 + orbit], PHASE1B_EDGE_SIZE)
+            for orbit in range(2)])
+
+        # Phase 2: small per-coordinate move tables, pruned on the corner and edge products
+        tables.update({
+            'corner_domino_moves': build_move_table(phase2_permutations, [first for first, _ in CORNER_DOMINOES], (1,) * 8),
+            'ud_corner_moves': build_move_table(phase2_permutations, UD_CORNER_SLOTS, (4, 4)),
+            'side_edge_moves': build_move_table(phase2_permutations, SIDE_EDGE_SLOTS, (2, 2, 2, 2)),
+            'ud_edge_moves': build_move_table(phase2_permutations, UD_EDGE_SLOTS, (4, 4)),
+            'middle_edge_moves': build_move_table(phase2_permutations, [first for first, _ in MIDDLE_EDGE_DOMINOES], (1,) * 4),
+        })
+        corner_size = PHASE2_SIZES['corner_domino'] * PHASE2_SIZES['ud_corner']
+        edge_size = PHASE2_SIZES['side_edge'] * PHASE2_SIZES['ud_edge'] * PHASE2_SIZES['middle_edge']
+        tables['phase2_corner_prune'] = bfs_distances(
+            lambda index, turn: self._phase2_corner_index(tables, index, turn),
+            range(len(PHASE2_TURNS)), np.array([0]), corner_size)
+        tables['phase2_edge_prune'] = bfs_distances(
+            lambda index, turn: self._phase2_edge_index(tables, index, turn),
+            range(len(PHASE2_TURNS)), np.array([0]), edge_size)
+
+        for name, table in tables.items():
+            with atomic_write(self._path(name)) as handle:
+                np.save(handle, table)
+
+    @staticmethod
+    def _check_dominoes(phase2_permutations):
+        # Every phase 2 move must carry each domino's two stickers together
+        for dominoes in (CORNER_DOMINOES, MIDDLE_EDGE_DOMINOES):
+            pairs = set(dominoes)
+            for permutation in phase2_permutations:
+                destination = np.argsort(permutation)  # Where each sticker ends up
+                for first, second in dominoes:
+                    if (destination[first], destination[second]) not in pairs:
+                        raise RuntimeError('phase 2 moves do not preserve the sticker dominoes')
+
+    @staticmethod
+    def _prune(neighbour, goal_turns, turns, solved, size):
+        # Distance under `turns` to the closure of the solved coordinate under `goal_turns`
+        goal = np.flatnonzero(bfs_distances(neighbour, goal_turns, np.array([solved]), size) != UNREACHED)
+        return bfs_distances(neighbour, turns, goal, size)
+
+    @staticmethod
+    def _subset_turn(moves, coords, turn):
+        # Apply a face turn to subset coordinates through the quarter-turn move table
+        face, amount = FACE_TURNS[turn]
+        if amount == 3:
+            return moves[MOVE_INDEX[(face, -1)]][coords]
+        table = moves[MOVE_INDEX[(face, 1)]]
+        coords = table[coords]
+        return table[coords] if amount == 2 else coords
+
+    @staticmethod
+    def _phase2_corner_index(tables, index, turn):
+        # Combined corner index domino * 70 + top/bottom corners after phase 2 turn number `turn`
+        domino, ud = np.divmod(index, PHASE2_SIZES['ud_corner'])
+        return (tables['corner_domino_moves'][turn][domino] * PHASE2_SIZES['ud_corner']
+                + tables['ud_corner_moves'][turn][ud])
+
+    @staticmethod
+    def _phase2_edge_index(tables, index, turn):
+        # Combined edge index (side * 70 + top/bottom) * 24 + middle after phase 2 turn number `turn`
+        rest, middle = np.divmod(index, PHASE2_SIZES['middle_edge'])
+        side, ud = np.divmod(rest, PHASE2_SIZES['ud_edge'])
+        side = tables['side_edge_moves'][turn][side]
+        ud = tables['ud_edge_moves'][turn][ud]
+        middle = tables['middle_edge_moves'][turn][middle]
+        return (side * PHASE2_SIZES['ud_edge'] + ud) * PHASE2_SIZES['middle_edge'] + middle
+
+    # ------------------------------------------------------------- coordinates
+
+    @staticmethod
+    def _phase1a_coordinates(stickers):
+        # (N, 54) stickers -> (N, 4): edge Front/Back and Top/Bottom classes, edge Right and Left colors
+        edges = stickers[:, EDGE_SLOTS]
+        classes = COLOR_CLASSES[edges]
+        return np.stack([rank_multiset((classes == 0).astype(np.int8), SUBSET_COUNTS),
+                         rank_multiset((classes == 2).astype(np.int8), SUBSET_COUNTS),
+                         rank_multiset((edges == 2).astype(np.int8), COLOR_COUNTS),
+                         rank_multiset((edges == 3).astype(np.int8), COLOR_COUNTS)], axis=1)
+
+    @staticmethod
+    def _phase1b_coordinates(stickers):
+        # (N, 54) stickers inside phase 1b -> (N, 5): the three corner classes, then both edge orbits
+        classes = COLOR_CLASSES[stickers[:, CORNER_SLOTS]]
+        columns = [rank_multiset((classes == color_class).astype(np.int8), SUBSET_COUNTS) for color_class in range(3)]
+        for slots, lowest, counts in PHASE1B_EDGE_ORBITS:
+            columns.append(rank_multiset(stickers[:, slots] - lowest, counts))
+        return np.stack(columns, axis=1)
+
+    @staticmethod
+    def _phase2_coordinates(stickers):
+        # (N, 54) stickers -> (N, 5) phase 2 coordinates and a mask of rows that are inside phase 2 at all
+        corner_dominoes = _domino_ids(CORNER_DOMINOES, stickers)
+        middle_dominoes = _domino_ids(MIDDLE_EDGE_DOMINOES, stickers)
+        valid = ((np.sort(corner_dominoes, axis=1) == np.arange(8)).all(axis=1)
+                 & (np.sort(middle_dominoes, axis=1) == np.arange(4)).all(axis=1))
+        ud_corners = stickers[:, UD_CORNER_SLOTS]
+        ud_edges = stickers[:, UD_EDGE_SLOTS]
+        side_edges = stickers[:, SIDE_EDGE_SLOTS]
+        valid &= ((ud_corners >= 4).all(axis=1) & (ud_edges >= 4).all(axis=1) & (side_edges < 4).all(axis=1)
+                  & ((ud_corners == 4).sum(axis=1) == 4) & ((ud_edges == 4).sum(axis=1) == 4)
+                  & (np.stack([(side_edges == color).sum(axis=1) for color in range(4)], axis=1) == 2).all(axis=1))
+
+        coords = np.zeros((len(stickers), 5), dtype=np.int64)
+        if valid.any():
+            rows = np.flatnonzero(valid)
+            coords[rows, 0] = rank_multiset(corner_dominoes[rows], (1,) * 8)
+            coords[rows, 1] = rank_multiset(ud_corners[rows] - 4, (4, 4))
+            coords[rows, 2] = rank_multiset(side_edges[rows], (2, 2, 2, 2))
+            coords[rows, 3] = rank_multiset(ud_edges[rows] - 4, (4, 4))
+            coords[rows, 4] = rank_multiset(middle_dominoes[rows], (1,) * 4)
+        return coords, valid
+
+    # ------------------------------------------------------------------ search
+
+    def solve(self, cube):
+        """Return a list of (face, direction) moves that solves the cube, or [] if time_limit passes first"""
+        return turns_to_moves(self.solve_state(cube.get_state()) or [])
+
+    def solve_state(self, state):
+        """Solve a sticker state and return the solution as face-turn indices, or None if time_limit passes
+        before any solution is found"""
+        if self.tables is None:
+            self.load_tables()
+        check_state(state)
+        stickers = np.asarray(state, dtype=np.int8).reshape(1, 54)
+
+        self._start = stickers
+        self._best = None
+        start = time.perf_counter()
+        self._deadline = None if self.time_limit is None else start + self.time_limit
+        self._improve_deadline = None if self.improve_time is None else start + self.improve_time
+        phase1a = (range(len(FACE_TURNS)), self._phase1a_turn, self._phase1a_heuristic, self._accept_phase1a)
+        root = self._phase1a_coordinates(stickers)
+        bound = int(self._phase1a_heuristic(root)[0])
+        # Deepen phase 1a until a full solution is accepted, no shorter one can exist or time is up. Every
+        # phase 1a solution of one length goes on to phase 1b together, so the easiest of them is found first.
+        while not self._timed_out() and (self._best is None or bound < len(self._best)):
+            self._phase1a_paths, self._phase1a_stickers = [], []
+            self._search(phase1a, root, np.array([NO_LAST_TURN]), 0, bound, [])
+            if self._timed_out():
+                break  # The phase 1a solutions of this bound are incomplete
+            if self._phase1a_paths and self._phase1b(np.concatenate(self._phase1a_paths),
+                                                     np.concatenate(self._phase1a_stickers)):
+                break
+            bound += 1
+        return self._best
+
+    def _deepen(self, phase, roots, max_depth):
+        # Iterative deepening from a set of roots until the phase's accept stops it or max_depth is passed
+        for bound in range(int(phase[2](roots).min()), max_depth + 1):
+            if self._search(phase, roots, np.full(len(roots), NO_LAST_TURN), 0, bound, []):
+                return True
+        return False
+
+    def _search(self, phase, coords, last, depth, bound, trail):
+        # Depth-limited search over a whole level of nodes at once, in chunks of SEARCH_CHUNK.
+        # trail holds one (parent row, turn) pair of arrays per level for rebuilding paths.
+        turns, step, heuristic, accept = phase
+        if depth == bound:
+            return accept(coords, last, trail)
+        for start in range(0, len(coords), SEARCH_CHUNK):
+            if self._timed_out():
+                return True  # Unwinds every phase; the best solution so far, if any, stands
+            chunk = coords[start:start + SEARCH_CHUNK]
+            chunk_last = last[start:start + SEARCH_CHUNK]
+            children, parents, child_turns = [], [], []
+            for turn in turns:
+                rows = np.flatnonzero(ALLOWED_SUCCESSORS[chunk_last, turn])
+                if not rows.size:
+                    continue
+                child = step(chunk[rows], turn)
+                keep = heuristic(child) < bound - depth  # depth + 1 + h <= bound
+                children.append(child[keep])
+                parents.append(rows[keep] + start)
+                child_turns.append(np.full(int(keep.sum()), turn, dtype=np.int8))
+            child_turns = np.concatenate(child_turns)
+            if not child_turns.size:
+                continue
+            trail.append((np.concatenate(parents), child_turns))
+            found = self._search(phase, np.concatenate(children), child_turns, depth + 1, bound, trail)
+            trail.pop()
+            if found:
+                return True
+        return False
+
+    @staticmethod
+    def _paths(trail, rows):
+        # Backtrack leaf rows through the trail into a (len(rows), depth) matrix of turns and their root rows
+        paths = np.empty((len(rows), len(trail)), dtype=np.int8)
+        for level in range(len(trail) - 1, -1, -1):
+            parents, turns = trail[level]
+            paths[:, level] = turns[rows]
+            rows = parents[rows]
+        return paths, rows
+
+    @staticmethod
+    def _leaves(starts, last, trail, next_turns):
+        # Leaf rows worth handing to the next phase: their paths, root rows and the stickers they lead to.
+        # A path ending in one of the next phase's turns was already tried one level up.
+        rows = np.arange(len(last))
+        if trail:
+            rows = rows[~np.isin(last, next_turns)]
+        paths, roots = TwoPhaseSolver._paths(trail, rows)
+        stickers = starts[roots]
+        for column in paths.T:
+            stickers = np.take_along_axis(stickers, TURN_PERMUTATIONS[column], axis=1)
+        return paths, roots, stickers
+
+    def _limit(self, used, max_depth):
+        # Deepest search still worth running after `used` turns, given the best solution so far
+        if self._best is None:
+            return max_depth
+        return min(max_depth, len(self._best) - used - 1)
+
+    def _phase1a_turn(self, coords, turn):
+        return np.concatenate([self._subset_turn(self.tables['edge_subset_moves'], coords[:, :2], turn),
+                               self._subset_turn(self.tables['edge_color_moves'], coords[:, 2:], turn)], axis=1)
+
+    def _phase1a_heuristic(self, coords):
+        subset, color = self.tables['phase1a_subset_prune'], self.tables['phase1a_color_prune']
+        return np.maximum(np.maximum(subset[0][coords[:, 0]], subset[1][coords[:, 1]]),
+                          np.maximum(color[0][coords[:, 2]], color[1][coords[:, 3]]))
+
+    def _accept_phase1a(self, coords, last, trail):
+        # Every leaf is inside phase 1b, which the pruning tables describe exactly; collect them all
+        paths, _, stickers = self._leaves(self._start, last, trail, PHASE1B_TURNS)
+        self._phase1a_paths.append(paths)
+        self._phase1a_stickers.append(stickers)
+        return False
+
+    def _phase1b(self, paths, stickers):
+        # Search phase 1b from every phase 1a solution at once
+        self._phase1a_paths, self._phase1a_stickers = paths, stickers
+        phase1b = (PHASE1B_TURNS, self._phase1b_turn, self._phase1b_heuristic, self._accept_phase1b)
+        if self._deepen(phase1b, self._phase1b_coordinates(stickers),
+                        self._limit(paths.shape[1], self.max_phase1b_depth)):
+            return True
+        return self._best is not None and self._done()
+
+    def _phase1b_turn(self, coords, turn):
+        edges = self.tables['phase1b_edge_moves'][:, PHASE1B_INDEX[turn]]
+        return np.concatenate([self._subset_turn(self.tables['corner_subset_moves'], coords[:, :3], turn),
+                               edges[0][coords[:, 3]][:, None], edges[1][coords[:, 4]][:, None]], axis=1)
+
+    def _phase1b_heuristic(self, coords):
+        corner, edge = self.tables['phase1b_corner_prune'], self.tables['phase1b_edge_prune']
+        estimate = np.maximum(edge[0][coords[:, 3]], edge[1][coords[:, 4]])
+        for column in range(3):
+            estimate = np.maximum(estimate, corner[column][coords[:, column]])
+        return estimate
+
+    def _accept_phase1b(self, coords, last, trail):
+        # Leaves have every class on the right slots; only those whose dominoes also pair up are in phase 2
+        paths, roots, stickers = self._leaves(self._phase1a_stickers, last, trail, PHASE2_TURNS)
+        phase2_coords, valid = self._phase2_coordinates(stickers)
+        for row in np.flatnonzero(valid):
+            prefix = self._phase1a_paths[roots[row]].tolist() + paths[row].tolist()
+            turns = self._phase2(phase2_coords[row], self._limit(len(prefix), self.max_phase2_depth))
+            if turns is None:
+                if self._timed_out():
+                    return True
+                continue
+            solution = _merge_turns(prefix + turns)
+            if self._best is None or len(solution) < len(self._best):
+                self._best = solution
+            if self._done():
+                return True
+        return False
+
+    def _done(self):
+        # Stop at the first solution unless asked to look for a shorter one within improve_time
+        if self.max_length is None or len(self._best) <= self.max_length:
+            return True
+        return self._timed_out()
+
+    def _timed_out(self):
+        # Past time_limit, or past improve_time with a solution in hand
+        now = time.perf_counter()
+        if self._deadline is not None and now > self._deadline:
+            return True
+        return self._best is not None and self._improve_deadline is not None and now > self._improve_deadline
+
+    def _phase2(self, coords, max_depth):
+        # IDA* inside phase 2 from one state, returning face-turn indices or None past max_depth
+        root = np.array([[coords[0] * PHASE2_SIZES['ud_corner'] + coords[1],
+                          (coords[2] * PHASE2_SIZES['ud_edge'] + coords[3]) * PHASE2_SIZES['middle_edge'] + coords[4]]])
+        phase2 = (PHASE2_TURNS, self._phase2_turn, self._phase2_heuristic, self._accept_phase2)
+        self._phase2_solution = None
+        if self._deepen(phase2, root, max_depth):
+            return self._phase2_solution
+        return None
+
+    def _phase2_turn(self, coords, turn):
+        index = PHASE2_TURNS.index(turn)
+        return np.stack([self._phase2_corner_index(self.tables, coords[:, 0], index),
+                         self._phase2_edge_index(self.tables, coords[:, 1], index)], axis=1)
+
+    def _phase2_heuristic(self, coords):
+        return np.maximum(self.tables['phase2_corner_prune'][coords[:, 0]],
+                          self.tables['phase2_edge_prune'][coords[:, 1]])
+
+    def _accept_phase2(self, coords, last, trail):
+        # Both pruning tables are exact, so every leaf is the solved cube
+        self._phase2_solution = self._paths(trail, np.array([0]))[0][0].tolist()
+        return True
+
+
+def _merge_turns(turns):
+    # Combine consecutive turns of the same face, e.g. where phase 1 and phase 2 meet
+    merged = []
+    for turn in turns:
+        face, amount = FACE_TURNS[turn]
+        if merged and FACE_TURNS[merged[-1]][0] == face:
+            amount = (FACE_TURNS[merged.pop()][1] + amount) % 4
+            if amount:
+                merged.append(3 * face + amount - 1)
+        else:
+            merged.append(turn)
+    return merged